@@ -0,0 +1,141 @@
+"""
+Async data-access layer for Mental Health Support Chatbot
+Awaitable mirror of database.py that keeps sqlite3 off the event loop
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import config
+import database as db
+
+# Reads fan out over a bounded pool; writes are serialized on one thread so
+# they never queue behind each other for SQLite's write lock.
+_read_pool = ThreadPoolExecutor(
+    max_workers=config.DB_READ_WORKERS,
+    thread_name_prefix="db-read",
+)
+_write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+
+async def run_read(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking read (or read-mostly helper) on the read pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_read_pool, functools.partial(fn, *args, **kwargs))
+
+
+async def run_write(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking write on the single writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_write_pool, functools.partial(fn, *args, **kwargs))
+
+
+def _reader(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_read(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _writer(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_write(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def shutdown():
+    """Wait for queued work and stop the executor threads"""
+    _write_pool.shutdown(wait=True)
+    _read_pool.shutdown(wait=True)
+
+
+# ══════════════════════════════════════════════════════════════
+# USERS
+# ══════════════════════════════════════════════════════════════
+
+# get_or_create_user (a.k.a. load_user_data) may insert, so it goes through the writer
+get_or_create_user = _writer(db.get_or_create_user)
+load_user_data = get_or_create_user
+get_user = _reader(db.get_user)
+# Shared cached record - read-only callers only
+get_user_snapshot = _reader(db.get_user_snapshot)
+save_user_data = _writer(db.save_user_data)
+get_all_users = _reader(db.get_all_users)
+get_user_stats = _reader(db.get_user_stats)
+delete_user_data = _writer(db.delete_user_data)
+
+# ══════════════════════════════════════════════════════════════
+# CHAT MESSAGES
+# ══════════════════════════════════════════════════════════════
+
+append_chat_message = _writer(db.append_chat_message)
+get_chat_history = _reader(db.get_chat_history)
+get_chat_messages_since = _reader(db.get_chat_messages_since)
+count_chat_messages = _reader(db.count_chat_messages)
+clear_chat_history = _writer(db.clear_chat_history)
+
+# ══════════════════════════════════════════════════════════════
+# MOOD ENTRIES & TRANSITIONS
+# ══════════════════════════════════════════════════════════════
+
+save_mood_entry = _writer(db.save_mood_entry)
+get_mood_entry = _reader(db.get_mood_entry)
+save_mood_analysis = _writer(db.save_mood_analysis)
+get_mood_entries = _reader(db.get_mood_entries)
+count_mood_entries = _reader(db.count_mood_entries)
+get_mood_entries_by_date = _reader(db.get_mood_entries_by_date)
+get_mood_entries_dates = _reader(db.get_mood_entries_dates)
+log_mood_transition = _writer(db.log_mood_transition)
+get_mood_transitions = _reader(db.get_mood_transitions)
+get_last_transition_id = _reader(db.get_last_transition_id)
+get_session_mood_summary = _reader(db.get_session_mood_summary)
+clear_old_transitions = _writer(db.clear_old_transitions)
+
+# ══════════════════════════════════════════════════════════════
+# SUMMARIES
+# ══════════════════════════════════════════════════════════════
+
+save_daily_summary = _writer(db.save_daily_summary)
+get_daily_summaries = _reader(db.get_daily_summaries)
+save_weekly_summary = _writer(db.save_weekly_summary)
+get_weekly_summaries = _reader(db.get_weekly_summaries)
+save_monthly_summary = _writer(db.save_monthly_summary)
+get_monthly_summaries = _reader(db.get_monthly_summaries)
+load_all_summaries = _reader(db.load_all_summaries)
+get_daily_summaries_between = _reader(db.get_daily_summaries_between)
+get_weekly_summaries_between = _reader(db.get_weekly_summaries_between)
+get_context_summaries = _reader(db.get_context_summaries)
+get_summary_watermark = _reader(db.get_summary_watermark)
+set_summary_watermark = _writer(db.set_summary_watermark)
+delete_old_summaries = _writer(db.delete_old_summaries)
+
+# ══════════════════════════════════════════════════════════════
+# CALENDAR EVENTS
+# ══════════════════════════════════════════════════════════════
+
+save_calendar_event = _writer(db.save_calendar_event)
+get_calendar_events = _reader(db.get_calendar_events)
+delete_calendar_event = _writer(db.delete_calendar_event)
+
+# ══════════════════════════════════════════════════════════════
+# BACKGROUND JOB QUEUE
+# ══════════════════════════════════════════════════════════════
+
+enqueue_job = _writer(db.enqueue_job)
+claim_jobs = _writer(db.claim_jobs)
+complete_job = _writer(db.complete_job)
+fail_job = _writer(db.fail_job)
+reset_running_jobs = _writer(db.reset_running_jobs)
+
+# ══════════════════════════════════════════════════════════════
+# MOOD ANALYSIS CACHE
+# ══════════════════════════════════════════════════════════════
+
+get_cached_mood_analysis = _reader(db.get_cached_mood_analysis)
+save_cached_mood_analysis = _writer(db.save_cached_mood_analysis)
+purge_mood_analysis_cache = _writer(db.purge_mood_analysis_cache)
@@ -0,0 +1,120 @@
+"""
+Background Job Worker
+Runs queued work (e.g. summary generation) off the request path
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import config
+import async_database as adb
+
+# kind -> (handler, max concurrent jobs)
+_handlers: Dict[str, tuple] = {}
+_wakeups: Dict[str, asyncio.Event] = {}
+_loops: Dict[str, asyncio.Task] = {}
+
+
+def register_handler(
+    kind: str,
+    handler: Callable[[str, Optional[Dict]], Awaitable[None]],
+    concurrency: int = 1,
+):
+    """
+    Register the coroutine that processes jobs of a kind
+
+    The handler is called as handler(job_key, payload). Raising marks the
+    attempt as failed; the job is retried until JOB_MAX_ATTEMPTS.
+    """
+    _handlers[kind] = (handler, max(1, concurrency))
+
+
+async def enqueue(kind: str, job_key: str, payload: Optional[Dict] = None):
+    """Persist a job (deduplicated on kind + job_key) and wake its worker"""
+    await adb.enqueue_job(kind, job_key, payload)
+    wake(kind)
+
+
+def wake(kind: str):
+    """Have a kind's worker check for jobs now (after queueing them in a transaction of your own)"""
+    if kind in _wakeups:
+        _wakeups[kind].set()
+
+
+async def start():
+    """Start one worker loop per registered kind"""
+    await adb.reset_running_jobs()
+    for kind in _handlers:
+        if kind not in _loops:
+            _wakeups[kind] = asyncio.Event()
+            _loops[kind] = asyncio.create_task(_worker_loop(kind))
+    print(f"⚙️ Background workers started: {', '.join(_handlers) or 'none'}")
+
+
+async def stop():
+    """Cancel the worker loops; interrupted jobs are re-queued on next start"""
+    for task in _loops.values():
+        task.cancel()
+    await asyncio.gather(*_loops.values(), return_exceptions=True)
+    _loops.clear()
+    _wakeups.clear()
+
+
+async def _run_job(kind: str, job: Dict, slots: asyncio.Semaphore, running: Set[asyncio.Task]):
+    handler, _ = _handlers[kind]
+    try:
+        await handler(job["job_key"], job["payload"])
+        await adb.complete_job(kind, job["job_key"])
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️ {kind} job {job['job_key']} failed: {e}")
+        await adb.fail_job(
+            kind, job["job_key"], str(e),
+            max_attempts=config.JOB_MAX_ATTEMPTS,
+        )
+    finally:
+        # Leave the running set before freeing the slot, so the loop it
+        # wakes sees the free capacity
+        running.discard(asyncio.current_task())
+        slots.release()
+
+
+async def _worker_loop(kind: str):
+    _, concurrency = _handlers[kind]
+    slots = asyncio.Semaphore(concurrency)
+    wakeup = _wakeups[kind]
+    poll_interval = config.JOB_POLL_INTERVAL_SECONDS
+    running: Set[asyncio.Task] = set()
+
+    try:
+        while True:
+            wakeup.clear()
+
+            # Only claim as many jobs as there are free slots
+            free = concurrency - len(running)
+            try:
+                jobs = await adb.claim_jobs(kind, free) if free > 0 else []
+            except Exception as e:
+                # e.g. "database is locked" during a bulk import; keep the loop alive
+                print(f"⚠️ Claiming {kind} jobs failed: {e}")
+                await asyncio.sleep(poll_interval)
+                continue
+            for job in jobs:
+                await slots.acquire()
+                task = asyncio.create_task(_run_job(kind, job, slots, running))
+                running.add(task)
+
+            if jobs and len(jobs) == free:
+                # Queue may hold more; go again as soon as a slot frees up
+                await slots.acquire()
+                slots.release()
+                continue
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for task in list(running):
+            task.cancel()
@@ -0,0 +1,163 @@
+"""
+Benchmark: per-call sqlite3.connect vs pooled WAL connections
+
+Runs concurrent reader and writer threads against a scratch database for a
+fixed duration and reports ops/sec for each mode. The "before" mode mimics
+the original database.py pattern (connect, execute, commit, close on every
+call, default rollback journal, and the text-timestamp index its queries
+relied on); the "after" mode goes through the pooled connection manager in
+database.py.
+
+Usage:
+    python benchmarks/db_connection_bench.py [--readers 4] [--writers 2] [--seconds 5]
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+USER_ID = "bench_user"
+
+
+# ══════════════════════════════════════════════════════════════
+# BEFORE: open/commit/close on every call
+# ══════════════════════════════════════════════════════════════
+
+def legacy_log_transition(path: str, i: int):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO mood_transitions (user_id, mood, intensity, message, context, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (USER_ID, "calm", i % 10 + 1, "bench", "", str(datetime.now())))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_transitions(path: str):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, mood, intensity, message, context, timestamp
+        FROM mood_transitions
+        WHERE user_id = ?
+        ORDER BY timestamp DESC
+        LIMIT 10
+    """, (USER_ID,))
+    cursor.fetchall()
+    conn.close()
+
+
+# ══════════════════════════════════════════════════════════════
+# AFTER: pooled connections via database.py
+# ══════════════════════════════════════════════════════════════
+
+def pooled_log_transition(path: str, i: int):
+    db.log_mood_transition(USER_ID, "calm", i % 10 + 1, message="bench", context="")
+
+
+def pooled_get_transitions(path: str):
+    db.get_mood_transitions(USER_ID, limit=10)
+
+
+def run(mode: str, path: str, readers: int, writers: int, seconds: float) -> dict:
+    write_fn, read_fn = {
+        "before": (legacy_log_transition, legacy_get_transitions),
+        "after": (pooled_log_transition, pooled_get_transitions),
+    }[mode]
+
+    counts = {"read": [0] * readers, "write": [0] * writers, "errors": [0]}
+    stop = threading.Event()
+
+    def writer(idx: int):
+        i = 0
+        while not stop.is_set():
+            try:
+                write_fn(path, i)
+                counts["write"][idx] += 1
+            except sqlite3.OperationalError:
+                counts["errors"][0] += 1
+            i += 1
+        db.close_connections()
+
+    def reader(idx: int):
+        while not stop.is_set():
+            try:
+                read_fn(path)
+                counts["read"][idx] += 1
+            except sqlite3.OperationalError:
+                counts["errors"][0] += 1
+        db.close_connections()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "reads_per_sec": sum(counts["read"]) / seconds,
+        "writes_per_sec": sum(counts["write"]) / seconds,
+        "errors": counts["errors"][0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("before", "after"):
+            path = os.path.join(tmp, f"{mode}.db")
+            db.DB_PATH = path
+            if mode == "before":
+                # Build the schema without leaving the file in WAL mode, plus
+                # the original index legacy_get_transitions sorts by (it was
+                # replaced by the epoch-column ones), so its reads don't pay
+                # for a sort the old code never did
+                db.init_db()
+                db.close_connections()
+                conn = sqlite3.connect(path)
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_user_transitions
+                    ON mood_transitions(user_id, timestamp)
+                """)
+                conn.close()
+            else:
+                db.init_db()
+            # database.py logs every transition; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[mode] = run(mode, path, args.readers, args.writers, args.seconds)
+            db.close_connections()
+
+    print(f"\nreaders={args.readers} writers={args.writers} duration={args.seconds}s")
+    print(f"{'mode':<8} {'reads/s':>12} {'writes/s':>12} {'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['reads_per_sec']:>12.0f} {r['writes_per_sec']:>12.0f} {r['errors']:>8}")
+
+    before, after = results["before"], results["after"]
+    if before["reads_per_sec"] and before["writes_per_sec"]:
+        print(f"\nspeedup: reads x{after['reads_per_sec'] / before['reads_per_sec']:.1f}, "
+              f"writes x{after['writes_per_sec'] / before['writes_per_sec']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
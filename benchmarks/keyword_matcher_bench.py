@@ -0,0 +1,92 @@
+"""
+Benchmark: per-keyword substring scans vs the compiled keyword matcher
+
+Times the original detection path (detect_crisis, detect_mood,
+estimate_intensity and detect_calendar_intent each lowercasing the message
+and running `kw in text` per keyword) against one uncached pass of
+keyword_matcher.scan_message (its single trie-shaped regex), on synthetic
+messages of increasing length. The cache is bypassed, so the numbers are
+the per-scan cost alone.
+
+Usage:
+    python benchmarks/keyword_matcher_bench.py [--lengths 200 2000 20000] [--repeat 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import keyword_matcher as km  # noqa: E402
+
+FILLER = (
+    "i dont know what to say it has been a long week and work keeps piling up "
+    "my friends keep asking how im doing and i just say fine "
+).split()
+
+
+# ══════════════════════════════════════════════════════════════
+# BEFORE: one `in` scan per keyword, per detector
+# ══════════════════════════════════════════════════════════════
+
+def legacy_scan(message: str):
+    lower = message.lower()
+    crisis = any(kw in lower for kw in km.CRISIS_KEYWORDS)
+
+    mood = None
+    for name, keywords in km.MOOD_KEYWORDS.items():
+        if any(kw in lower for kw in keywords):
+            mood = name
+            break
+
+    intensity = sum(1 for kw in km.INTENSITY_KEYWORDS if kw in message.lower())
+
+    lower = message.lower()
+    calendar = any(kw in lower for kw in km.CALENDAR_KEYWORDS) or any(
+        kw in lower for kw in km.TIME_KEYWORDS
+    )
+    return crisis, mood, intensity, calendar
+
+
+# ══════════════════════════════════════════════════════════════
+# AFTER: one compiled pass (cache bypassed)
+# ══════════════════════════════════════════════════════════════
+
+def matcher_scan(message: str):
+    return km.scan_message.__wrapped__(message)
+
+
+def make_message(length: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(FILLER)
+        words.append(word)
+        size += len(word) + 1
+    # One real hit near the end so neither side can exit early on crisis
+    words.append("so overwhelmed")
+    return " ".join(words)[:length + 15]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'chars':>8} {'before us':>12} {'after us':>12} {'speedup':>9}")
+    for length in args.lengths:
+        message = make_message(length)
+        before = timeit.timeit(lambda: legacy_scan(message), number=args.repeat)
+        after = timeit.timeit(lambda: matcher_scan(message), number=args.repeat)
+        per_before = before / args.repeat * 1e6
+        per_after = after / args.repeat * 1e6
+        print(f"{length:>8} {per_before:>12.1f} {per_after:>12.1f} {per_before / per_after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
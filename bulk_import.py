@@ -0,0 +1,346 @@
+"""
+Bulk Import
+Backfills mood entries, mood transitions and chat history from NDJSON or CSV
+in chunked transactions, without the per-entry work of POST /api/mood/log
+
+Records use the same shape as the NDJSON export ("type" plus columns), so an
+export can be imported back, into the same or another user; rows the user
+already has are skipped, so repeating an import is harmless:
+    {"type": "mood_entry", "mood": "sad", "intensity": 6, "notes": "...", "timestamp": "2024-03-01 09:30:00"}
+    {"type": "mood_transition", "mood": "calm", "intensity": 3, "message": "...", "timestamp": "..."}
+    {"type": "chat_message", "role": "user", "text": "...", "ts": "..."}
+CSV files use the same column names; pass --type if there is no type column.
+
+Usage:
+    python bulk_import.py FILE [--user USER_ID] [--format ndjson|csv] [--type mood_entry]
+                          [--batch-size 1000] [--db mental_health.db] [--enrich]
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config
+import database as db
+
+RECORD_TYPES = ("mood_entry", "mood_transition", "chat_message")
+
+# Export record types that have nothing to import into
+IGNORED_TYPES = ("user", "daily_summary", "weekly_summary", "monthly_summary", "calendar_event")
+
+MAX_REPORTED_ERRORS = 20
+
+# ══════════════════════════════════════════════════════════════
+# PARSING
+# ══════════════════════════════════════════════════════════════
+
+
+def iter_records(stream, fmt: str = "ndjson", default_type: Optional[str] = None) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """
+    Yield (line number, record) pairs from a text stream, one at a time
+
+    record is None for a line that isn't valid JSON. CSV cells that are
+    empty become None.
+    """
+    if fmt == "ndjson":
+        for lineno, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield lineno, None
+                continue
+            if isinstance(record, dict) and default_type:
+                record.setdefault("type", default_type)
+            yield lineno, record if isinstance(record, dict) else None
+    elif fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            record = {key: (value if value != "" else None) for key, value in row.items() if key}
+            if default_type and not record.get("type"):
+                record["type"] = default_type
+            yield reader.line_num, record
+    else:
+        raise ValueError(f"unknown import format: {fmt}")
+
+
+def _timestamp(record: Dict, *keys: str) -> Tuple[str, int]:
+    """
+    Normalize an ISO date/datetime to the local str(datetime) text the
+    tables use, plus its epoch seconds
+    """
+    for key in keys:
+        value = record.get(key)
+        if value:
+            break
+    else:
+        raise ValueError("missing timestamp")
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if len(str(value)) == 10:
+        # Date only - noon, like a dated POST /api/mood/log
+        parsed = parsed.replace(hour=12)
+    if parsed.tzinfo is not None:
+        # Stored text is local wall-clock time, like str(datetime.now())
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return str(parsed), db.to_epoch(parsed)
+
+
+def _text(record: Dict, key: str) -> Optional[str]:
+    """A text field, rejecting lists, dicts and numbers that SQLite can't store as text"""
+    value = record.get(key)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value
+
+
+def _intensity(value) -> int:
+    if value is None:
+        raise ValueError("missing intensity")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError("intensity must be a finite number")
+    return min(10, max(1, int(value)))
+
+
+def _triggers(value) -> Optional[str]:
+    """JSON-encode triggers given as a list, a JSON list or "a;b;c" """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value) if value.lstrip().startswith("[") else [
+            t.strip() for t in value.split(";") if t.strip()
+        ]
+    if not isinstance(value, list) or not all(isinstance(t, str) for t in value):
+        raise ValueError("triggers must be a list of strings")
+    return json.dumps(value) if value else None
+
+
+def _entry_id(record: Dict, owner: str, timestamp: str) -> str:
+    """
+    Id for an imported mood entry
+
+    An entry keeps its id when imported for its own user. Copies for a
+    different user get an id derived from the original, and entries without
+    an id get one derived from their content, so importing the same file
+    again finds them as duplicates.
+    """
+    entry_id = record.get("id")
+    if not entry_id:
+        key = "\0".join(str(record.get(k)) for k in ("mood", "intensity", "notes"))
+        return db.scoped_mood_entry_id(owner, f"{timestamp}\0{key}")
+    source = record.get("user_id")
+    if source and source != owner:
+        return db.scoped_mood_entry_id(owner, entry_id)
+    return entry_id
+
+
+def _analysis(value) -> Optional[str]:
+    """Keep an exported entry's LLM analysis (a dict, or its JSON in CSV)"""
+    if not value:
+        return None
+    return json.dumps(json.loads(value) if isinstance(value, str) else value)
+
+
+# ══════════════════════════════════════════════════════════════
+# IMPORT
+# ══════════════════════════════════════════════════════════════
+
+
+def import_stream(
+    stream,
+    fmt: str = "ndjson",
+    user_id: Optional[str] = None,
+    default_type: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    enrich: bool = False,
+) -> Dict:
+    """
+    Import every record in a text stream, batch_size rows per transaction
+
+    Args:
+        stream: Text stream of NDJSON lines or CSV (read incrementally)
+        fmt: "ndjson" or "csv"
+        user_id: Import everything for this user; otherwise each record
+            needs its own user_id
+        default_type: Record type for records without one
+        batch_size: Rows per transaction (IMPORT_BATCH_SIZE by default)
+        enrich: Queue the background LLM analysis of mood entry notes,
+            as a manual mood log does (processed by the server's job
+            worker). Off by default, since it costs a model call per entry.
+
+    Returns:
+        Report with rows imported per type, duplicates (rows the user
+        already had), ignored and rejected counts, the first few errors, and rows/sec
+    """
+    batch_size = batch_size or config.IMPORT_BATCH_SIZE
+    if enrich:
+        from mood_tracker import ENRICHMENT_JOB
+    started = time.perf_counter()
+    report = {
+        "imported": dict.fromkeys(RECORD_TYPES, 0),
+        "duplicates": 0,
+        "ignored": 0,
+        "rejected": 0,
+        "errors": [],
+    }
+    known_users = set()
+    entries: List[tuple] = []
+    transitions: List[tuple] = []
+    messages: Dict[str, List[Dict]] = {}
+    pending = 0
+
+    def flush():
+        nonlocal entries, transitions, messages, pending
+        if not pending:
+            return
+        inserted = db.import_batch(
+            entries, transitions, messages,
+            enrichment_job=ENRICHMENT_JOB if enrich else None,
+        )
+        report["duplicates"] += pending - sum(inserted.values())
+        for record_type, count in inserted.items():
+            report["imported"][record_type] += count
+        entries, transitions, messages, pending = [], [], {}, 0
+
+    def reject(lineno: int, error: str):
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": lineno, "error": error})
+
+    for lineno, record in iter_records(stream, fmt, default_type):
+        if record is None:
+            reject(lineno, "invalid JSON")
+            continue
+
+        record_type = record.get("type")
+        if record_type in IGNORED_TYPES:
+            report["ignored"] += 1
+            continue
+        if record_type not in RECORD_TYPES:
+            reject(lineno, f"unknown record type: {record_type!r}")
+            continue
+
+        owner = user_id or record.get("user_id")
+        if not owner:
+            reject(lineno, "missing user_id")
+            continue
+        if not isinstance(owner, str):
+            reject(lineno, "user_id must be a string")
+            continue
+
+        try:
+            if record_type == "mood_entry":
+                mood = _text(record, "mood")
+                if not mood:
+                    raise ValueError("missing mood")
+                _text(record, "id")
+                timestamp, ts = _timestamp(record, "timestamp", "date")
+                entries.append((
+                    _entry_id(record, owner, timestamp),
+                    owner,
+                    mood,
+                    _intensity(record.get("intensity")),
+                    _text(record, "notes"),
+                    _triggers(record.get("triggers")),
+                    _analysis(record.get("analysis")),
+                    timestamp,
+                    ts,
+                ))
+            elif record_type == "mood_transition":
+                mood = _text(record, "mood")
+                if not mood:
+                    raise ValueError("missing mood")
+                transitions.append((
+                    owner,
+                    mood,
+                    _intensity(record.get("intensity")),
+                    _text(record, "message"),
+                    _text(record, "context"),
+                    *_timestamp(record, "timestamp"),
+                ))
+            else:
+                text = _text(record, "text")
+                if not text:
+                    raise ValueError("missing text")
+                messages.setdefault(owner, []).append({
+                    "role": _text(record, "role") or "user",
+                    "text": text,
+                    "timestamp": _timestamp(record, "ts", "timestamp")[0],
+                })
+        except (TypeError, ValueError) as e:
+            reject(lineno, str(e))
+            continue
+
+        if owner not in known_users:
+            db.get_or_create_user(owner)
+            known_users.add(owner)
+
+        pending += 1
+        if pending >= batch_size:
+            flush()
+
+    flush()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(report["imported"].values())
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(rows / elapsed) if elapsed > 0 else rows
+    return report
+
+
+def import_file(binary_file, fmt: str = "ndjson", **kwargs) -> Dict:
+    """import_stream for a binary file object (e.g. an upload), decoded as UTF-8"""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        return import_stream(text, fmt, **kwargs)
+    finally:
+        text.detach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import mood entries, transitions and chat history")
+    parser.add_argument("file", help="NDJSON or CSV file")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    parser.add_argument("--user", help="import every record for this user")
+    parser.add_argument("--type", choices=RECORD_TYPES, help="record type for rows without one")
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE)
+    parser.add_argument("--db", default=config.DATABASE_PATH)
+    parser.add_argument("--enrich", action="store_true", help="queue LLM analysis of mood entry notes for the server's job worker")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+    db.DB_PATH = args.db
+    db.init_db()
+    # Same upgrades as server startup, so dedup sees every row's epoch column
+    db.migrate_history_blobs()
+    db.backfill_epoch_columns()
+
+    with open(args.file, encoding="utf-8-sig", newline="") as f:
+        report = import_stream(
+            f, fmt, user_id=args.user, default_type=args.type,
+            batch_size=args.batch_size, enrich=args.enrich,
+        )
+    if any(report["imported"].values()):
+        # Running servers hold mood bars that haven't seen these rows
+        from mood_live import mark_stale
+        mark_stale()
+
+    imported = ", ".join(f"{count} {record_type}" for record_type, count in report["imported"].items())
+    print(f"✅ Imported {imported} in {report['seconds']}s ({report['rows_per_sec']} rows/sec)")
+    if report["duplicates"] or report["ignored"]:
+        print(f"↩️ Skipped {report['duplicates']} already imported rows, ignored {report['ignored']} records")
+    if report["rejected"]:
+        print(f"⚠️ Rejected {report['rejected']} rows")
+        for error in report["errors"]:
+            print(f"   line {error['line']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,47 +11,15 @@ import re
 
 from tools.calendar_tools import create_event, get_events, modify_event, delete_event
 import config
+from keyword_matcher import CALENDAR_KEYWORDS, TIME_KEYWORDS, scan_message
 
 logger = logging.getLogger(__name__)
 
-# Simple keyword detection
-CALENDAR_KEYWORDS = [
-    "schedule",
-    "appointment",
-    "meeting",
-    "reminder",
-    "calendar",
-    "book",
-    "plan",
-    "set up",
-    "arrange",
-    "therapy",
-    "meditation",
-]
-
-TIME_KEYWORDS = [
-    "tomorrow",
-    "today",
-    "next week",
-    "monday",
-    "tuesday",
-    "wednesday",
-    "thursday",
-    "friday",
-    "saturday",
-    "sunday",
-    "at",
-    "pm",
-    "am",
-]
-
-
 def detect_calendar_intent(message: str) -> bool:
     """Check if message contains calendar-related intent."""
-    message_lower = message.lower()
-    has_keyword = any(kw in message_lower for kw in CALENDAR_KEYWORDS)
-    has_time = any(kw in message_lower for kw in TIME_KEYWORDS)
-    return has_keyword or has_time
+    if not message:
+        return False
+    return any(hit.category in ("calendar", "time") for hit in scan_message(message))
 
 
 def extract_event_type(message: str) -> str:
@@ -19,6 +19,11 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY_HERE")
 # OpenAI Model
 OPENAI_MODEL = "gpt-4o"
 
+# Shared HTTP connection pool for the async OpenAI client
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+LLM_TIMEOUT_SECONDS = 30.0
+
 # ══════════════════════════════════════════════════════════════
 # SERVER CONFIGURATION
 # ══════════════════════════════════════════════════════════════
@@ -42,6 +47,12 @@ ALLOWED_ORIGINS = [
 
 DATABASE_PATH = "mental_health.db"
 
+# Threads in the async data-access layer's read pool (writes use one thread)
+DB_READ_WORKERS = 8
+
+# Rows per transaction for bulk imports (python bulk_import.py / POST .../import)
+IMPORT_BATCH_SIZE = 1000
+
 # ══════════════════════════════════════════════════════════════
 # CHATBOT CONFIGURATION
 # ══════════════════════════════════════════════════════════════
@@ -54,6 +65,59 @@ USE_HUMAN_LIKE_TEXT = True
 # Context window
 MAX_HISTORY_MESSAGES = 10
 
+# Run mood analysis concurrently with reply generation; the reply starts on
+# keyword-based guidance and is only regenerated if the LLM mood changes it
+PIPELINED_RESPONSES = True
+
+# Return reply + mood/intensity/confidence/notes from one JSON-mode completion
+# instead of separate mood and reply calls (takes precedence over pipelining)
+COMBINED_MOOD_AND_REPLY = False
+
+# Local mood classifier (python mood_classifier.py train); the LLM is only
+# asked when the classifier's confidence is below the threshold
+LOCAL_MOOD_CLASSIFIER = True
+MOOD_CLASSIFIER_PATH = "models/mood_classifier.npz"
+MOOD_CLASSIFIER_THRESHOLD = 0.75
+
+# Cache LLM mood analyses of short messages ("idk", "im tired") by content;
+# MOOD_CACHE_PERSIST also keeps them in SQLite across restarts
+MOOD_CACHE_MAX_ENTRIES = 5000
+MOOD_CACHE_MAX_CHARS = 200
+MOOD_CACHE_TTL_SECONDS = 24 * 60 * 60
+MOOD_CACHE_PERSIST = True
+
+# Live mood bar (GET /api/mood/current) kept in memory: sliding window for
+# the counts, transitions shown, and users held before the least recent is
+# dropped (and reloaded from SQLite on its next read). Only set
+# MOOD_BAR_REVALIDATE_SECONDS when several server processes share the
+# database: a read at least that long after a user's last check then
+# compares their newest transition id with SQLite and reloads on mismatch
+MOOD_BAR_WINDOW_MINUTES = 60
+MOOD_BAR_RECENT_TRANSITIONS = 10
+MOOD_BAR_MAX_USERS = 10000
+MOOD_BAR_REVALIDATE_SECONDS = None
+
+# Push updates (/ws/mood, /api/mood/stream): events buffered per subscriber
+# before the oldest is dropped, and the keepalive interval on idle streams
+MOOD_EVENTS_QUEUE_SIZE = 100
+MOOD_EVENTS_HEARTBEAT_SECONDS = 15
+
+# ══════════════════════════════════════════════════════════════
+# BACKGROUND JOBS
+# ══════════════════════════════════════════════════════════════
+
+# Summary jobs generated at once (each can make several LLM calls)
+SUMMARY_WORKER_CONCURRENCY = 2
+
+# Mood-log enrichment jobs (LLM reading of the notes) run at once
+MOOD_ENRICHMENT_CONCURRENCY = 4
+
+# How often idle workers re-check the persistent queue
+JOB_POLL_INTERVAL_SECONDS = 5.0
+
+# Attempts before a job is parked as 'failed'
+JOB_MAX_ATTEMPTS = 3
+
 # ══════════════════════════════════════════════════════════════
 # CRISIS SUPPORT RESOURCES
 # ══════════════════════════════════════════════════════════════
@@ -5,160 +5,535 @@ Handles user data persistence and retrieval
 
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import sqlite3
 from pathlib import Path
 
 # Database file
 DB_PATH = "mental_health.db"
 
-def init_db():
-    """Initialize the database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            data TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            last_activity TEXT NOT NULL
-        )
-    """)
-    
-    # Mood entries table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mood_entries (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            mood TEXT NOT NULL,
-            intensity INTEGER NOT NULL,
-            notes TEXT,
-            triggers TEXT,
-            timestamp TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
-        )
-    """)
+# Connection tuning (applied once per pooled connection)
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16 * 1024          # page cache per connection
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+# Upper bound for keyset cursors when no cursor is given
+_MAX_KEY = 2 ** 63 - 1
+
+# Parsed user records kept in process (see USER DATA CACHE)
+USER_CACHE_MAX_ENTRIES = 1024
+
+# (table, integer epoch column, text column it mirrors)
+_EPOCH_COLUMNS = (
+    ("mood_entries", "ts", "timestamp"),
+    ("mood_transitions", "ts", "timestamp"),
+    ("calendar_events", "start_ts", "start_time"),
+)
+
+# ══════════════════════════════════════════════════════════════
+# CONNECTION MANAGEMENT
+# ══════════════════════════════════════════════════════════════
+
+_local = threading.local()
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Open a long-lived connection with WAL journaling and tuned pragmas"""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def _open_readonly_connection(path: str) -> sqlite3.Connection:
+    """Open a long-lived read-only connection (mode=ro) with the read pragmas"""
+    uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA query_only=ON")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+def get_connection(readonly: bool = False) -> sqlite3.Connection:
+    """Get this thread's (read-write or read-only) connection to DB_PATH, opening it on first use"""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    
+    key = (DB_PATH, readonly)
+    conn = connections.get(key)
+    if conn is None:
+        opener = _open_readonly_connection if readonly else _open_connection
+        conn = connections[key] = opener(DB_PATH)
+    return conn
+
+def close_connections():
+    """Close every connection opened by the calling thread"""
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Cursor]:
+    """
+    Yield a cursor inside a write transaction on this thread's connection
     
-    # Mood transitions table - for continuous mood tracking
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mood_transitions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            mood TEXT NOT NULL,
-            intensity INTEGER NOT NULL,
-            message TEXT,
-            context TEXT,
-            timestamp TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
-        )
-    """)
+    The outermost block takes the write lock up front (BEGIN IMMEDIATE),
+    commits on success and rolls back on error. Nested blocks join the
+    enclosing transaction.
+    """
+    conn = get_connection()
+    depth = getattr(_local, "tx_depth", 0)
+    if depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+        _local.committed_events = []
     
-    # Daily summaries table - NEW
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS daily_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            date TEXT NOT NULL,
-            summary TEXT NOT NULL,
-            message_count INTEGER NOT NULL,
-            generated_at TEXT NOT NULL,
-            UNIQUE(user_id, date),
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
-        )
-    """)
+    _local.tx_depth = depth + 1
+    cursor = conn.cursor()
+    try:
+        yield cursor
+        if depth == 0:
+            conn.commit()
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+            _local.committed_events = []
+        raise
+    finally:
+        _local.tx_depth = depth
+        cursor.close()
+    
+    if depth == 0:
+        _notify_commit_listeners()
+
+@contextmanager
+def read_cursor() -> Iterator[sqlite3.Cursor]:
+    """
+    Yield a cursor for read-only queries
     
-    # Weekly summaries table - NEW
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS weekly_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            week_key TEXT NOT NULL,
-            week_start TEXT NOT NULL,
-            summary TEXT NOT NULL,
-            days_count INTEGER NOT NULL,
-            generated_at TEXT NOT NULL,
-            UNIQUE(user_id, week_key),
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
-        )
-    """)
+    Outside a transaction this uses the thread's mode=ro connection, which
+    can never take the write lock; inside one it joins the transaction's
+    connection so uncommitted writes stay visible.
+    """
+    in_transaction = getattr(_local, "tx_depth", 0) > 0
+    cursor = get_connection(readonly=not in_transaction).cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+# ══════════════════════════════════════════════════════════════
+# COMMIT LISTENERS
+# ══════════════════════════════════════════════════════════════
+
+# event -> callbacks(user_id, record), see add_commit_listener
+_commit_listeners: Dict[str, List[Callable[[str, Optional[Dict]], None]]] = {}
+
+def add_commit_listener(event: str, callback: Callable[[str, Optional[Dict]], None]):
+    """
+    Call callback(user_id, record) whenever a write of this kind commits
+    
+    Events:
+        mood_transition: record is the new transition (id, mood, intensity,
+            message, context, timestamp, ts)
+        mood_entry: record is the new entry, shaped like get_mood_entries
+        mood_transitions_invalidated: record is None; some of the user's
+            transitions were deleted or bulk imported
+    
+    Callbacks run on the writing thread (the async layer's writer) right
+    after the outermost transaction commits, never for a rolled-back
+    write, so they must be quick and thread-safe.
+    """
+    _commit_listeners.setdefault(event, []).append(callback)
+
+def _after_commit(event: str, user_id: str, record: Optional[Dict] = None):
+    """Queue an event for the listeners once the current transaction commits"""
+    if _commit_listeners.get(event):
+        _local.committed_events.append((event, user_id, record))
+
+def _notify_commit_listeners():
+    events, _local.committed_events = _local.committed_events, []
+    for event, user_id, record in events:
+        for callback in _commit_listeners.get(event, ()):
+            try:
+                callback(user_id, record)
+            except Exception as e:
+                print(f"⚠️ {event} listener failed: {e}")
+
+# ══════════════════════════════════════════════════════════════
+# TIMESTAMPS
+# ══════════════════════════════════════════════════════════════
+
+def to_epoch(value) -> Optional[int]:
+    """
+    Epoch seconds for a datetime or ISO timestamp string, None if unparseable
     
-    # Monthly summaries table - NEW
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS monthly_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            month_key TEXT NOT NULL,
-            summary TEXT NOT NULL,
-            weeks_count INTEGER NOT NULL,
-            generated_at TEXT NOT NULL,
-            UNIQUE(user_id, month_key),
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
+    Naive values are local time, like the str(datetime.now()) text stored
+    alongside them.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return int(value.timestamp())
+
+def _local_day(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d")
+
+def day_bounds(date: str) -> Tuple[int, int]:
+    """[start, end) epoch seconds of a local YYYY-MM-DD day"""
+    start = datetime.strptime(date, "%Y-%m-%d")
+    return to_epoch(start), to_epoch(start + timedelta(days=1))
+
+def init_db():
+    """Initialize the database"""
+    with transaction() as cursor:
+        # Users table - version is bumped on every write to data
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_activity TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("PRAGMA table_info(users)")
+        if "version" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    
+        # Mood entries table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mood_entries (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                mood TEXT NOT NULL,
+                intensity INTEGER NOT NULL,
+                notes TEXT,
+                triggers TEXT,
+                timestamp TEXT NOT NULL,
+                ts INTEGER,
+                analysis TEXT,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+        cursor.execute("PRAGMA table_info(mood_entries)")
+        if "analysis" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE mood_entries ADD COLUMN analysis TEXT")
+    
+        # Mood transitions table - for continuous mood tracking
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mood_transitions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                mood TEXT NOT NULL,
+                intensity INTEGER NOT NULL,
+                message TEXT,
+                context TEXT,
+                timestamp TEXT NOT NULL,
+                ts INTEGER,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Daily summaries table - NEW
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                message_count INTEGER NOT NULL,
+                generated_at TEXT NOT NULL,
+                UNIQUE(user_id, date),
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Weekly summaries table - NEW
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS weekly_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                week_key TEXT NOT NULL,
+                week_start TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                days_count INTEGER NOT NULL,
+                generated_at TEXT NOT NULL,
+                UNIQUE(user_id, week_key),
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Monthly summaries table - NEW
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS monthly_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                month_key TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                weeks_count INTEGER NOT NULL,
+                generated_at TEXT NOT NULL,
+                UNIQUE(user_id, month_key),
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Summary watermarks - last chat seq folded into daily summaries per user
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS summary_watermarks (
+                user_id TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Mood analysis cache - LLM results keyed by a hash of the normalized message
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mood_analysis_cache (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+    
+        # Calendar events table - NEW
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS calendar_events (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                google_event_id TEXT,
+                title TEXT NOT NULL,
+                description TEXT,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                category TEXT,
+                source TEXT,
+                created_at TEXT NOT NULL,
+                start_ts INTEGER,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Chat messages table - one row per turn, replaces the "history" list in users.data
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                user_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                text TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                PRIMARY KEY (user_id, seq),
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        """)
+    
+        # Background job queue - one row per (kind, job_key), so duplicates collapse
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS background_jobs (
+                kind TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                rerun INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                enqueued_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (kind, job_key)
+            )
+        """)
+    
+        # Integer epoch-second copies of the text timestamps, for index range
+        # scans; rows from older builds are filled by backfill_epoch_columns()
+        for table, column, _ in _EPOCH_COLUMNS:
+            cursor.execute(f"PRAGMA table_info({table})")
+            if column not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+    
+        # Create indexes
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mood_entries_ts 
+            ON mood_entries(user_id, ts)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mood_transitions_ts 
+            ON mood_transitions(user_id, ts)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daily_summaries 
+            ON daily_summaries(user_id, date)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_weekly_summaries 
+            ON weekly_summaries(user_id, week_key)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_weekly_summaries_start 
+            ON weekly_summaries(user_id, week_start)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_monthly_summaries 
+            ON monthly_summaries(user_id, month_key)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_calendar_events_start_ts 
+            ON calendar_events(user_id, start_ts, id)
+        """)
+    
+        # Text-timestamp indexes replaced by the epoch ones above
+        for index in ("idx_user_mood", "idx_user_transitions", "idx_calendar_events"):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_background_jobs 
+            ON background_jobs(kind, status, enqueued_at)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_transitions_id 
+            ON mood_transitions(user_id, id)
+        """)
+    
+        # Per-user counters maintained alongside the rows they count (see USER STATS)
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_stats'"
         )
-    """)
-    
-    # Calendar events table - NEW
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS calendar_events (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            google_event_id TEXT,
-            title TEXT NOT NULL,
-            description TEXT,
-            start_time TEXT NOT NULL,
-            end_time TEXT NOT NULL,
-            category TEXT,
-            source TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        backfill_stats = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                mood_entry_count INTEGER NOT NULL DEFAULT 0,
+                transition_count INTEGER NOT NULL DEFAULT 0,
+                active_days INTEGER NOT NULL DEFAULT 0,
+                first_active_ts INTEGER,
+                last_active_ts INTEGER
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_active_days (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                PRIMARY KEY (user_id, day)
+            ) WITHOUT ROWID
+        """)
+        if backfill_stats:
+            _rebuild_user_stats(cursor)
+    
+        # Per-user, per-day mood entry aggregates (see MOOD ROLLUPS)
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mood_daily_rollups'"
         )
-    """)
-    
-    # Create indexes
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_user_mood 
-        ON mood_entries(user_id, timestamp)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_user_transitions 
-        ON mood_transitions(user_id, timestamp)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_daily_summaries 
-        ON daily_summaries(user_id, date)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_weekly_summaries 
-        ON weekly_summaries(user_id, week_key)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_monthly_summaries 
-        ON monthly_summaries(user_id, month_key)
-    """)
-    
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_calendar_events 
-        ON calendar_events(user_id, start_time)
-    """)
-    
-    conn.commit()
-    conn.close()
+        backfill_rollups = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mood_daily_rollups (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                intensity_sum INTEGER NOT NULL,
+                intensity_sumsq INTEGER NOT NULL,
+                mood_counts TEXT NOT NULL,
+                hour_counts TEXT NOT NULL,
+                hour_sums TEXT NOT NULL,
+                trigger_counts TEXT NOT NULL,
+                PRIMARY KEY (user_id, day)
+            )
+        """)
+        if backfill_rollups:
+            _rebuild_mood_rollups(cursor)
     print("✅ Database initialized")
 
+# ══════════════════════════════════════════════════════════════
+# USER DATA CACHE
+# ══════════════════════════════════════════════════════════════
+
+class _CachedUser:
+    """One users row as last seen: its version, raw JSON and (lazily) parsed snapshot"""
+    __slots__ = ("version", "raw", "snapshot")
+    
+    def __init__(self, version: int, raw: str):
+        self.version = version
+        self.raw = raw
+        self.snapshot = None
+
+# (DB_PATH, user_id) -> _CachedUser, least recently used first
+_user_cache: "OrderedDict[Tuple[str, str], _CachedUser]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def _remember_user(user_id: str, version: int, raw: str) -> _CachedUser:
+    entry = _CachedUser(version, raw)
+    with _user_cache_lock:
+        _user_cache[(DB_PATH, user_id)] = entry
+        _user_cache.move_to_end((DB_PATH, user_id))
+        while len(_user_cache) > USER_CACHE_MAX_ENTRIES:
+            _user_cache.popitem(last=False)
+    return entry
+
+def invalidate_user_cache(user_id: Optional[str] = None):
+    """Drop one user's cached record, or every record if user_id is None"""
+    with _user_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop((DB_PATH, user_id), None)
+
+def _read_user(user_id: str) -> Optional[_CachedUser]:
+    """
+    Get a user's row through the cache
+    
+    The stored version is always checked (a primary-key lookup), so writes
+    from other workers are picked up; the data column is only read and
+    re-cached when the version differs from the cached one.
+    """
+    with _user_cache_lock:
+        cached = _user_cache.get((DB_PATH, user_id))
+        if cached:
+            _user_cache.move_to_end((DB_PATH, user_id))
+    
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT version, CASE WHEN version = ? THEN NULL ELSE data END
+            FROM users
+            WHERE user_id = ?
+        """, (cached.version if cached else -1, user_id))
+        row = cursor.fetchone()
+    
+    if row is None:
+        invalidate_user_cache(user_id)
+        return None
+    if row[1] is None:
+        return cached
+    return _remember_user(user_id, row[0], row[1])
+
+# Keys that used to live in users.data and now have their own tables
+LEGACY_BLOB_KEYS = ("history", "summaries", "mood_entries")
+
 def get_default_user_data() -> Dict:
     """Get default user data structure"""
     return {
         "user_id": "",
         "created_at": str(datetime.now()),
         "last_activity": str(datetime.now()),
-        "history": [],
-        "mood_entries": [],
         "current_session_moods": [],  # Track moods in current session
         "profile": {
             "name": "",
@@ -171,7 +546,6 @@ def get_default_user_data() -> Dict:
         },
         "stats": {
             "total_conversations": 0,
-            "total_mood_logs": 0,
             "days_active": 0
         },
         "flags": {
@@ -180,21 +554,40 @@ def get_default_user_data() -> Dict:
         }
     }
 
-def load_user_data(user_id: str) -> Dict:
-    """Load user data from database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT data FROM users WHERE user_id = ?",
-        (user_id,)
-    )
+def get_user(user_id: str) -> Optional[Dict]:
+    """
+    Load user data without creating anything (None for unknown users)
     
-    row = cursor.fetchone()
-    conn.close()
+    Returns a private copy. Never writes: legacy blob keys are dropped from
+    the copy rather than migrated.
+    """
+    cached = _read_user(user_id)
+    if cached is None:
+        return None
+    
+    data = json.loads(cached.raw)
+    for key in LEGACY_BLOB_KEYS:
+        data.pop(key, None)
+    return data
+
+def get_or_create_user(user_id: str) -> Dict:
+    """Load user data, creating the user on first sight (a private copy the caller may modify and save)"""
+    cached = _read_user(user_id)
     
-    if row:
-        data = json.loads(row[0])
+    if cached:
+        data = json.loads(cached.raw)
+        
+        # Blob not yet picked up by migrate_history_blobs - move it over now
+        if any(key in data for key in LEGACY_BLOB_KEYS):
+            with transaction() as cursor:
+                cursor.execute(
+                    "SELECT data FROM users WHERE user_id = ?",
+                    (user_id,)
+                )
+                data = json.loads(cursor.fetchone()[0])
+                if any(key in data for key in LEGACY_BLOB_KEYS):
+                    _migrate_user_blob(cursor, user_id, data)
+        
         return data
     else:
         # Create new user
@@ -203,88 +596,509 @@ def load_user_data(user_id: str) -> Dict:
         save_user_data(user_id, data)
         return data
 
-def save_user_data(user_id: str, data: Dict):
-    """Save user data to database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    data["last_activity"] = str(datetime.now())
+# Older name, kept for existing callers
+load_user_data = get_or_create_user
+
+def get_user_snapshot(user_id: str) -> Optional[Dict]:
+    """
+    Load user data for read-only use (None for unknown users)
     
-    cursor.execute("""
-        INSERT OR REPLACE INTO users (user_id, data, created_at, last_activity)
-        VALUES (?, ?, ?, ?)
-    """, (
-        user_id,
-        json.dumps(data),
-        data.get("created_at", str(datetime.now())),
-        data["last_activity"]
-    ))
-    
-    conn.commit()
-    conn.close()
+    Returns the cached parsed record shared by every caller until the user
+    is next saved, so it must not be modified - use get_or_create_user for
+    read-modify-save.
+    """
+    cached = _read_user(user_id)
+    if cached is None:
+        return None
+    
+    snapshot = cached.snapshot
+    if snapshot is None:
+        snapshot = cached.snapshot = json.loads(cached.raw)
+    return snapshot
+
+def save_user_data(user_id: str, data: Dict):
+    """Save user data to database (chat history and summaries have their own tables)"""
+    with transaction() as cursor:
+        data["last_activity"] = str(datetime.now())
+        blob = {k: v for k, v in data.items() if k not in LEGACY_BLOB_KEYS}
+        raw = json.dumps(blob)
+    
+        cursor.execute("""
+            INSERT INTO users (user_id, data, created_at, last_activity, version)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET
+                data = excluded.data,
+                created_at = excluded.created_at,
+                last_activity = excluded.last_activity,
+                version = users.version + 1
+        """, (
+            user_id,
+            raw,
+            data.get("created_at", str(datetime.now())),
+            data["last_activity"]
+        ))
+        cursor.execute("SELECT version FROM users WHERE user_id = ?", (user_id,))
+        version = cursor.fetchone()[0]
+    
+    # Write-through once committed; inside an outer transaction it may still roll back
+    if getattr(_local, "tx_depth", 0) == 0:
+        _remember_user(user_id, version, raw)
+    else:
+        invalidate_user_cache(user_id)
 
 def get_all_users() -> List[str]:
     """Get all user IDs"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with read_cursor() as cursor:
+        cursor.execute("SELECT user_id FROM users")
+        users = [row[0] for row in cursor.fetchall()]
+    return users
+
+# ══════════════════════════════════════════════════════════════
+# USER STATS
+# ══════════════════════════════════════════════════════════════
+
+# One user_stats row per user, updated in the same transaction as the chat
+# messages, mood entries and transitions it counts. Activity is dated by the
+# rows' own timestamps, so imported history counts on the days it happened.
+# Transitions are counted as logged; clear_old_transitions doesn't lower the
+# count. clear_chat_history resets message_count but keeps active days.
+
+def _record_user_activity(cursor, user_id: str, epochs, **deltas: int):
+    """
+    Add to a user's counters and fold the rows' timestamps (epoch seconds)
+    into their active days and first/last activity
+    """
+    epochs = [epoch for epoch in epochs if epoch is not None]
+    new_days = 0
+    for day in {_local_day(epoch) for epoch in epochs}:
+        cursor.execute(
+            "INSERT OR IGNORE INTO user_active_days (user_id, day) VALUES (?, ?)",
+            (user_id, day)
+        )
+        new_days += cursor.rowcount
+    if new_days:
+        deltas["active_days"] = new_days
+    
+    columns = list(deltas)
+    cursor.execute(f"""
+        INSERT INTO user_stats (user_id, first_active_ts, last_active_ts{"".join(", " + col for col in columns)})
+        VALUES (?, ?, ?{", ?" * len(columns)})
+        ON CONFLICT(user_id) DO UPDATE SET
+            first_active_ts = COALESCE(MIN(first_active_ts, excluded.first_active_ts),
+                                       first_active_ts, excluded.first_active_ts),
+            last_active_ts = COALESCE(MAX(last_active_ts, excluded.last_active_ts),
+                                      last_active_ts, excluded.last_active_ts)
+            {"".join(f", {col} = {col} + excluded.{col}" for col in columns)}
+    """, (user_id, min(epochs, default=None), max(epochs, default=None), *deltas.values()))
+
+def _rebuild_user_stats(cursor):
+    """Recompute every user's stats from the stored rows (new or widened table)"""
+    cursor.execute("DELETE FROM user_active_days")
+    cursor.execute("""
+        INSERT INTO user_active_days (user_id, day)
+        SELECT user_id, substr(ts, 1, 10) FROM chat_messages
+        UNION SELECT user_id, substr(timestamp, 1, 10) FROM mood_entries
+        UNION SELECT user_id, substr(timestamp, 1, 10) FROM mood_transitions
+    """)
+    cursor.execute("DELETE FROM user_stats")
+    # Timestamps here are local str(datetime) text (epoch columns may not be
+    # backfilled yet); 'utc' converts them from local time
+    cursor.execute("""
+        WITH activity (user_id, kind, t) AS (
+            SELECT user_id, 'message', CAST(strftime('%s', ts, 'utc') AS INTEGER) FROM chat_messages
+            UNION ALL
+            SELECT user_id, 'entry', CAST(strftime('%s', timestamp, 'utc') AS INTEGER) FROM mood_entries
+            UNION ALL
+            SELECT user_id, 'transition', CAST(strftime('%s', timestamp, 'utc') AS INTEGER) FROM mood_transitions
+        )
+        INSERT INTO user_stats (user_id, message_count, mood_entry_count, transition_count,
+                                active_days, first_active_ts, last_active_ts)
+        SELECT user_id,
+               SUM(kind = 'message'), SUM(kind = 'entry'), SUM(kind = 'transition'),
+               (SELECT COUNT(*) FROM user_active_days d WHERE d.user_id = activity.user_id),
+               MIN(t), MAX(t)
+        FROM activity
+        GROUP BY user_id
+    """)
+
+def get_user_stats(user_id: str) -> Dict:
+    """
+    Get a user's activity counters (zeros for unknown users)
     
-    cursor.execute("SELECT user_id FROM users")
-    users = [row[0] for row in cursor.fetchall()]
+    Returns:
+        message_count, mood_entry_count, transition_count, active_days,
+        first_active and last_active (timestamps, or None)
+    """
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT message_count, mood_entry_count, transition_count, active_days,
+                   first_active_ts, last_active_ts
+            FROM user_stats
+            WHERE user_id = ?
+        """, (user_id,))
+        row = cursor.fetchone() or (0, 0, 0, 0, None, None)
+    return {
+        "message_count": row[0],
+        "mood_entry_count": row[1],
+        "transition_count": row[2],
+        "active_days": row[3],
+        "first_active": str(datetime.fromtimestamp(row[4])) if row[4] is not None else None,
+        "last_active": str(datetime.fromtimestamp(row[5])) if row[5] is not None else None,
+    }
+
+# ══════════════════════════════════════════════════════════════
+# CHAT MESSAGE FUNCTIONS
+# ══════════════════════════════════════════════════════════════
+
+def _insert_chat_messages(cursor, user_id: str, messages: List[Dict]) -> int:
+    """Append messages after the user's current last seq, returns the last seq written"""
+    cursor.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM chat_messages WHERE user_id = ?",
+        (user_id,)
+    )
+    seq = cursor.fetchone()[0]
+    
+    rows = []
+    now = str(datetime.now())
+    for msg in messages:
+        seq += 1
+        rows.append((
+            user_id,
+            seq,
+            msg.get("role", "user"),
+            msg.get("text", ""),
+            msg.get("timestamp") or now
+        ))
+    
+    cursor.executemany("""
+        INSERT INTO chat_messages (user_id, seq, role, text, ts)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    _record_user_activity(cursor, user_id, {to_epoch(row[4]) for row in rows},
+                          message_count=len(rows))
+    return seq
+
+def _migrate_user_blob(cursor, user_id: str, data: Dict):
+    """
+    Move legacy in-blob history and summaries into their tables and strip
+    them from the blob
     
-    conn.close()
-    return users
+    The blob's mood_entries list only duplicated rows of the mood_entries
+    table (counted in user_stats), so it is dropped along with
+    stats.total_mood_logs.
+    """
+    data.pop("mood_entries", None)
+    (data.get("stats") or {}).pop("total_mood_logs", None)
+    
+    history = data.pop("history", None) or []
+    if history:
+        _insert_chat_messages(cursor, user_id, history)
+    
+    # Rows already in the summary tables win over blob copies
+    summaries = data.pop("summaries", None) or {}
+    now = str(datetime.now())
+    for date, s in (summaries.get("daily") or {}).items():
+        cursor.execute("""
+            INSERT OR IGNORE INTO daily_summaries
+            (user_id, date, summary, message_count, generated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, date, s["summary"], s.get("message_count", 0),
+              s.get("generated_at") or now))
+    for week_key, s in (summaries.get("weekly") or {}).items():
+        cursor.execute("""
+            INSERT OR IGNORE INTO weekly_summaries
+            (user_id, week_key, week_start, summary, days_count, generated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, week_key, s.get("week_start", ""), s["summary"],
+              s.get("days_count", 0), s.get("generated_at") or now))
+    for month_key, s in (summaries.get("monthly") or {}).items():
+        # Older builds keyed months by week_key[:7] ("2024-W1"); those are unusable
+        if not (len(month_key) == 7 and month_key[4] == "-" and month_key[5:].isdigit()):
+            continue
+        cursor.execute("""
+            INSERT OR IGNORE INTO monthly_summaries
+            (user_id, month_key, summary, weeks_count, generated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, month_key, s["summary"], s.get("weeks_count", 0),
+              s.get("generated_at") or now))
+    
+    cursor.execute(
+        "UPDATE users SET data = ?, version = version + 1 WHERE user_id = ?",
+        (json.dumps(data), user_id)
+    )
+    invalidate_user_cache(user_id)
+
+def append_chat_message(user_id: str, role: str, text: str,
+                        timestamp: Optional[str] = None) -> int:
+    """Append a single chat message for a user, returns its seq"""
+    with transaction() as cursor:
+        seq = _insert_chat_messages(cursor, user_id, [
+            {"role": role, "text": text, "timestamp": timestamp}
+        ])
+    return seq
+
+def get_chat_history(user_id: str, limit: int = 50,
+                     before_seq: Optional[int] = None) -> List[Dict]:
+    """
+    Get the most recent chat messages for a user (oldest first)
+    
+    Pass the smallest seq of the previous page as before_seq to page back
+    through older messages.
+    """
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT seq, role, text, ts
+            FROM chat_messages
+            WHERE user_id = ? AND seq < ?
+            ORDER BY seq DESC
+            LIMIT ?
+        """, (user_id, _MAX_KEY if before_seq is None else before_seq, limit))
+    
+        messages = []
+        for row in cursor.fetchall():
+            messages.append({
+                "seq": row[0],
+                "role": row[1],
+                "text": row[2],
+                "timestamp": row[3]
+            })
+    return messages[::-1]
+
+def get_chat_messages_since(user_id: str, after_seq: int = 0) -> List[Dict]:
+    """Get all chat messages for a user with seq greater than after_seq (oldest first)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT seq, role, text, ts
+            FROM chat_messages
+            WHERE user_id = ? AND seq > ?
+            ORDER BY seq ASC
+        """, (user_id, after_seq))
+    
+        messages = []
+        for row in cursor.fetchall():
+            messages.append({
+                "seq": row[0],
+                "role": row[1],
+                "text": row[2],
+                "timestamp": row[3]
+            })
+    return messages
+
+def count_chat_messages(user_id: str) -> int:
+    """Count chat messages stored for a user (from the maintained counter)"""
+    with read_cursor() as cursor:
+        cursor.execute(
+            "SELECT message_count FROM user_stats WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+def count_mood_entries(user_id: str) -> int:
+    """Count mood entries stored for a user (from the maintained counter)"""
+    with read_cursor() as cursor:
+        cursor.execute(
+            "SELECT mood_entry_count FROM user_stats WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+def clear_chat_history(user_id: str) -> int:
+    """Delete all chat messages for a user"""
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM chat_messages WHERE user_id = ?", (user_id,))
+        deleted = cursor.rowcount
+        cursor.execute(
+            "UPDATE user_stats SET message_count = 0 WHERE user_id = ?",
+            (user_id,)
+        )
+        # seq restarts at 1, so the old watermark would hide new messages
+        cursor.execute("DELETE FROM summary_watermarks WHERE user_id = ?", (user_id,))
+    return deleted
+
+def migrate_history_blobs(batch_size: int = 50) -> int:
+    """
+    Move legacy users.data["history"] and ["summaries"] into their tables
+    and strip the duplicated ["mood_entries"] list
+    
+    Walks the users table by rowid in batches of batch_size so only one
+    batch of blobs is held in memory, committing after each batch.
+    
+    Returns:
+        Number of users migrated
+    """
+    migrated = 0
+    last_rowid = 0
+    while True:
+        with transaction() as cursor:
+            cursor.execute("""
+                SELECT rowid, user_id, data
+                FROM users
+                WHERE rowid > ?
+                  AND (json_type(data, '$.history') IS NOT NULL
+                       OR json_type(data, '$.summaries') IS NOT NULL
+                       OR json_type(data, '$.mood_entries') IS NOT NULL)
+                ORDER BY rowid
+                LIMIT ?
+            """, (last_rowid, batch_size))
+            rows = cursor.fetchall()
+            
+            for rowid, user_id, raw in rows:
+                _migrate_user_blob(cursor, user_id, json.loads(raw))
+                last_rowid = rowid
+                migrated += 1
+        
+        if not rows:
+            break
+    
+    if migrated:
+        print(f"📦 Migrated legacy chat history, summaries and mood lists for {migrated} users")
+    return migrated
+
+def backfill_epoch_columns(batch_size: int = 1000) -> int:
+    """
+    Fill the integer epoch columns for rows written before they existed
+    
+    Walks each table in rowid order, batch_size rows per short transaction,
+    so other writers get in between batches. Rows whose text timestamp
+    can't be parsed stay NULL and are left out of range queries.
+    
+    Returns:
+        Number of rows filled
+    """
+    filled = 0
+    for table, column, source in _EPOCH_COLUMNS:
+        # Mood entries without an epoch were left out of the rollups, so
+        # each one filled is counted in now
+        rollup_columns = ", mood, intensity, triggers" if table == "mood_entries" else ""
+        last_rowid = 0
+        while True:
+            with transaction() as cursor:
+                cursor.execute(f"""
+                    SELECT rowid, user_id, {source}{rollup_columns} FROM {table}
+                    WHERE rowid > ? AND {column} IS NULL
+                    ORDER BY rowid
+                    LIMIT ?
+                """, (last_rowid, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+                updates = []
+                counted = []
+                for rowid, user_id, text, *entry in rows:
+                    epoch = to_epoch(text)
+                    if epoch is not None:
+                        updates.append((epoch, rowid))
+                        if entry:
+                            mood, intensity, triggers = entry
+                            counted.append((user_id, epoch, mood, intensity,
+                                            json.loads(triggers) if triggers else None))
+                cursor.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates
+                )
+                _record_mood_rollups(cursor, counted)
+                filled += len(updates)
+    
+    if filled:
+        print(f"🕒 Backfilled epoch timestamps for {filled} rows")
+    return filled
 
 def save_mood_entry(user_id: str, entry_id: str, mood: str, intensity: int,
                    notes: Optional[str] = None, triggers: Optional[List[str]] = None,
-                   timestamp: Optional[datetime] = None):
-    """Save a mood entry"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    if timestamp is None:
-        timestamp = datetime.now()
+                   timestamp: Optional[datetime] = None,
+                   enrichment_job: Optional[str] = None):
+    """
+    Save a mood entry
     
-    cursor.execute("""
-        INSERT INTO mood_entries (id, user_id, mood, intensity, notes, triggers, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        entry_id,
-        user_id,
-        mood,
-        intensity,
-        notes,
-        json.dumps(triggers) if triggers else None,
-        str(timestamp)
-    ))
-    
-    conn.commit()
-    conn.close()
+    enrichment_job is a job kind to queue for the entry, in the same
+    transaction, when it has notes.
+    """
+    with transaction() as cursor:
+        if timestamp is None:
+            timestamp = datetime.now()
+    
+        cursor.execute("""
+            INSERT INTO mood_entries (id, user_id, mood, intensity, notes, triggers, timestamp, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            entry_id,
+            user_id,
+            mood,
+            intensity,
+            notes,
+            json.dumps(triggers) if triggers else None,
+            str(timestamp),
+            to_epoch(timestamp)
+        ))
+        _record_mood_rollups(cursor, [(user_id, to_epoch(timestamp), mood, intensity, triggers)])
+        if enrichment_job and notes:
+            enqueue_job(enrichment_job, entry_id)
+        _record_user_activity(cursor, user_id, [to_epoch(timestamp)], mood_entry_count=1)
+        _after_commit("mood_entry", user_id, {
+            "id": entry_id,
+            "mood": mood,
+            "intensity": intensity,
+            "notes": notes,
+            "triggers": triggers or None,
+            "timestamp": str(timestamp),
+            "analysis": None
+        })
+
+_MOOD_ENTRY_COLUMNS = "id, mood, intensity, notes, triggers, timestamp, analysis"
+
+def _mood_entry_from_row(row) -> Dict:
+    return {
+        "id": row[0],
+        "mood": row[1],
+        "intensity": row[2],
+        "notes": row[3],
+        "triggers": json.loads(row[4]) if row[4] else None,
+        "timestamp": row[5],
+        # Background LLM reading of the notes; None until the job has run
+        "analysis": json.loads(row[6]) if row[6] else None
+    }
+
+def get_mood_entry(entry_id: str) -> Optional[Dict]:
+    """Get one mood entry by id (with its user_id)"""
+    with read_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_MOOD_ENTRY_COLUMNS}, user_id
+            FROM mood_entries
+            WHERE id = ?
+        """, (entry_id,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    entry = _mood_entry_from_row(row)
+    entry["user_id"] = row[7]
+    return entry
+
+def save_mood_analysis(entry_id: str, analysis: Dict) -> bool:
+    """Attach an LLM analysis to a mood entry; the user's mood and intensity are kept"""
+    with transaction() as cursor:
+        cursor.execute(
+            "UPDATE mood_entries SET analysis = ? WHERE id = ?",
+            (json.dumps(analysis), entry_id)
+        )
+        updated = cursor.rowcount
+    return updated > 0
 
 def get_mood_entries(user_id: str, limit: int = 100) -> List[Dict]:
     """Get mood entries for a user"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, mood, intensity, notes, triggers, timestamp
-        FROM mood_entries
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    entries = []
-    for row in cursor.fetchall():
-        entries.append({
-            "id": row[0],
-            "mood": row[1],
-            "intensity": row[2],
-            "notes": row[3],
-            "triggers": json.loads(row[4]) if row[4] else None,
-            "timestamp": row[5]
-        })
-    
-    conn.close()
+    with read_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_MOOD_ENTRY_COLUMNS}
+            FROM mood_entries
+            WHERE user_id = ?
+            ORDER BY ts DESC, rowid DESC
+            LIMIT ?
+        """, (user_id, limit))
+    
+        entries = []
+        for row in cursor.fetchall():
+            entries.append(_mood_entry_from_row(row))
     return entries
 
 def get_mood_entries_by_date(user_id: str, date: str) -> List[Dict]:
@@ -298,34 +1112,47 @@ def get_mood_entries_by_date(user_id: str, date: str) -> List[Dict]:
     Returns:
         List of mood entries for that date
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Query for entries on the specified date (any time during that day)
-    # Use LIKE to match any timestamp that starts with the date
-    date_pattern = f"{date}%"
-    
-    cursor.execute("""
-        SELECT id, mood, intensity, notes, triggers, timestamp
-        FROM mood_entries
-        WHERE user_id = ? AND timestamp LIKE ?
-        ORDER BY timestamp DESC
-    """, (user_id, date_pattern))
-    
-    entries = []
-    for row in cursor.fetchall():
-        entries.append({
-            "id": row[0],
-            "mood": row[1],
-            "intensity": row[2],
-            "notes": row[3],
-            "triggers": json.loads(row[4]) if row[4] else None,
-            "timestamp": row[5]
-        })
-    
-    conn.close()
+    start, end = day_bounds(date)
+    with read_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_MOOD_ENTRY_COLUMNS}
+            FROM mood_entries
+            WHERE user_id = ? AND ts >= ? AND ts < ?
+            ORDER BY ts DESC, rowid DESC
+        """, (user_id, start, end))
+    
+        entries = []
+        for row in cursor.fetchall():
+            entries.append(_mood_entry_from_row(row))
     return entries
 
+def get_mood_entries_between(user_id: str, start: Optional[datetime] = None,
+                             end: Optional[datetime] = None,
+                             batch_size: int = 500) -> Iterator[Dict]:
+    """
+    Yield a user's mood entries with start <= timestamp < end, newest first
+    
+    Either bound may be None for an open window. Rows are read batch_size at
+    a time from one (user_id, ts) index range scan, so long windows don't
+    hold every row in memory at once. Consume the generator on the thread
+    that created it.
+    """
+    start_ts = to_epoch(start) if start is not None else -_MAX_KEY
+    end_ts = to_epoch(end) if end is not None else _MAX_KEY
+    with read_cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {_MOOD_ENTRY_COLUMNS}
+            FROM mood_entries
+            WHERE user_id = ? AND ts >= ? AND ts < ?
+            ORDER BY ts DESC, rowid DESC
+        """, (user_id, start_ts, end_ts))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _mood_entry_from_row(row)
+
 def get_mood_entries_dates(user_id: str, days: int = 60) -> List[str]:
     """
     Get list of dates that have mood entries (for calendar highlighting)
@@ -337,128 +1164,147 @@ def get_mood_entries_dates(user_id: str, days: int = 60) -> List[str]:
     Returns:
         List of date strings in YYYY-MM-DD format
     """
-    from datetime import timedelta
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    cutoff_str = str(cutoff_date)
-    
-    # Get all entries and extract dates
-    cursor.execute("""
-        SELECT timestamp
-        FROM mood_entries
-        WHERE user_id = ? AND timestamp >= ?
-        ORDER BY timestamp DESC
-    """, (user_id, cutoff_str))
-    
-    dates_set = set()
-    for row in cursor.fetchall():
-        timestamp_str = row[0]
-        try:
-            # Parse timestamp and extract date part
-            if isinstance(timestamp_str, str):
-                # Extract YYYY-MM-DD from timestamp string
-                date_part = timestamp_str.split()[0] if ' ' in timestamp_str else timestamp_str[:10]
-                if len(date_part) >= 10:
-                    dates_set.add(date_part[:10])  # Ensure YYYY-MM-DD format
-        except Exception:
-            continue
-    
-    dates = sorted(list(dates_set), reverse=True)
-    
-    conn.close()
+    start, _ = day_bounds((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"))
+    dates = []
+    with read_cursor() as cursor:
+        # Index range on (user_id, ts); rows arrive grouped by local day
+        cursor.execute("""
+            SELECT ts FROM mood_entries
+            WHERE user_id = ? AND ts >= ?
+            ORDER BY ts DESC
+        """, (user_id, start))
+        for (ts,) in cursor:
+            day = _local_day(ts)
+            if not dates or dates[-1] != day:
+                dates.append(day)
     return dates
 
 def log_mood_transition(user_id: str, mood: str, intensity: int, 
                        message: Optional[str] = None, context: Optional[str] = None):
     """Log a mood transition during conversation"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO mood_transitions (user_id, mood, intensity, message, context, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        mood,
-        intensity,
-        message,
-        context,
-        str(datetime.now())
-    ))
-    
-    conn.commit()
-    conn.close()
+    now = datetime.now()
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO mood_transitions (user_id, mood, intensity, message, context, timestamp, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            user_id,
+            mood,
+            intensity,
+            message,
+            context,
+            str(now),
+            to_epoch(now)
+        ))
+        transition_id = cursor.lastrowid
+        _record_user_activity(cursor, user_id, [to_epoch(now)], transition_count=1)
+        _after_commit("mood_transition", user_id, {
+            "id": transition_id,
+            "mood": mood,
+            "intensity": intensity,
+            "message": message,
+            "context": context,
+            "timestamp": str(now),
+            "ts": to_epoch(now)
+        })
     print(f"📊 Mood transition logged: {mood} ({intensity}/10) for user {user_id}")
 
-def get_mood_transitions(user_id: str, limit: int = 50) -> List[Dict]:
-    """Get mood transitions for a user"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, mood, intensity, message, context, timestamp
-        FROM mood_transitions
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    transitions = []
-    for row in cursor.fetchall():
-        transitions.append({
-            "id": row[0],
-            "mood": row[1],
-            "intensity": row[2],
-            "message": row[3],
-            "context": row[4],
-            "timestamp": row[5]
-        })
+def get_mood_transitions(user_id: str, limit: int = 50,
+                         before_id: Optional[int] = None) -> List[Dict]:
+    """
+    Get mood transitions for a user, newest first
     
-    conn.close()
+    Pass the smallest id of the previous page as before_id for the next one.
+    """
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT id, mood, intensity, message, context, timestamp
+            FROM mood_transitions
+            WHERE user_id = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (user_id, _MAX_KEY if before_id is None else before_id, limit))
+    
+        transitions = []
+        for row in cursor.fetchall():
+            transitions.append({
+                "id": row[0],
+                "mood": row[1],
+                "intensity": row[2],
+                "message": row[3],
+                "context": row[4],
+                "timestamp": row[5]
+            })
     return transitions
 
+def get_mood_transitions_since(user_id: str, since_ts: int) -> List[Dict]:
+    """Get a user's transitions at or after since_ts (epoch seconds), oldest first, with ts"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT id, mood, intensity, message, context, timestamp, ts
+            FROM mood_transitions
+            WHERE user_id = ? AND ts >= ?
+            ORDER BY ts ASC, id ASC
+        """, (user_id, since_ts))
+        columns = ("id", "mood", "intensity", "message", "context", "timestamp", "ts")
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def get_last_transition_id(user_id: str) -> int:
+    """Id of a user's newest transition, 0 if none (one idx_user_transitions_id lookup)"""
+    with read_cursor() as cursor:
+        cursor.execute("SELECT MAX(id) FROM mood_transitions WHERE user_id = ?", (user_id,))
+        return cursor.fetchone()[0] or 0
+
+def get_labelled_transitions(exclude_context_prefix: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    Get (message, mood, intensity) for every transition that has a message,
+    across all users - the training set for the local mood classifier
+
+    Rows whose context starts with exclude_context_prefix are skipped so the
+    classifier isn't retrained on its own predictions.
+    """
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT message, mood, intensity
+            FROM mood_transitions
+            WHERE message IS NOT NULL AND message != ''
+              AND (? IS NULL OR COALESCE(context, '') NOT LIKE ? || '%')
+            ORDER BY id
+        """, (exclude_context_prefix, exclude_context_prefix))
+        rows = [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+    return rows
+
 def get_session_mood_summary(user_id: str, minutes: int = 60) -> Dict:
     """Get mood summary for recent session (default last 60 minutes)"""
-    from datetime import timedelta
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Calculate cutoff time
-    cutoff_time = datetime.now() - timedelta(minutes=minutes)
-    cutoff_str = str(cutoff_time)
-    
-    cursor.execute("""
-        SELECT mood, intensity, timestamp
-        FROM mood_transitions
-        WHERE user_id = ? AND timestamp >= ?
-        ORDER BY timestamp ASC
-    """, (user_id, cutoff_str))
-    
-    transitions = []
-    mood_counts = {}
-    total_intensity = 0
-    count = 0
-    
-    for row in cursor.fetchall():
-        mood = row[0]
-        intensity = row[1]
-        timestamp = row[2]
+    with read_cursor() as cursor:
+        cutoff = to_epoch(datetime.now() - timedelta(minutes=minutes))
+    
+        cursor.execute("""
+            SELECT mood, intensity, timestamp
+            FROM mood_transitions
+            WHERE user_id = ? AND ts >= ?
+            ORDER BY ts ASC, id ASC
+        """, (user_id, cutoff))
+    
+        transitions = []
+        mood_counts = {}
+        total_intensity = 0
+        count = 0
+    
+        for row in cursor.fetchall():
+            mood = row[0]
+            intensity = row[1]
+            timestamp = row[2]
         
-        transitions.append({
-            "mood": mood,
-            "intensity": intensity,
-            "timestamp": timestamp
-        })
+            transitions.append({
+                "mood": mood,
+                "intensity": intensity,
+                "timestamp": timestamp
+            })
         
-        mood_counts[mood] = mood_counts.get(mood, 0) + 1
-        total_intensity += intensity
-        count += 1
-    
-    conn.close()
+            mood_counts[mood] = mood_counts.get(mood, 0) + 1
+            total_intensity += intensity
+            count += 1
     
     avg_intensity = round(total_intensity / count, 1) if count > 0 else None
     
@@ -479,166 +1325,252 @@ def get_session_mood_summary(user_id: str, minutes: int = 60) -> Dict:
 
 def clear_old_transitions(user_id: str, hours: int = 24):
     """Clear mood transitions older than specified hours"""
-    from datetime import timedelta
+    with transaction() as cursor:
+        cutoff = to_epoch(datetime.now() - timedelta(hours=hours))
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM mood_transitions
+            WHERE user_id = ? AND ts < ?
+        """, (user_id, cutoff))
     
-    cutoff_time = datetime.now() - timedelta(hours=hours)
-    cutoff_str = str(cutoff_time)
-    
-    cursor.execute("""
-        DELETE FROM mood_transitions
-        WHERE user_id = ? AND timestamp < ?
-    """, (user_id, cutoff_str))
-    
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+        deleted = cursor.rowcount
+        if deleted:
+            _after_commit("mood_transitions_invalidated", user_id)
     
     print(f"🧹 Cleared {deleted} old mood transitions for user {user_id}")
     return deleted
 
+# ══════════════════════════════════════════════════════════════
+# MOOD ROLLUPS
+# ══════════════════════════════════════════════════════════════
+
+# One row per (user, local day) of mood entries with everything
+# get_mood_insights needs, so insights cost O(days) instead of O(entries).
+# Rows only ever grow by the entries counted in, in the same transaction
+# that writes them (a new entry, an imported one, or one whose epoch column
+# was backfilled); a day is only recomputed from raw rows when the table is
+# first created.
+
+def _empty_rollup() -> Dict:
+    return {
+        "count": 0,
+        "intensity_sum": 0,
+        "intensity_sumsq": 0,
+        "mood_counts": {},
+        "hour_counts": [0] * 24,
+        "hour_sums": [0] * 24,
+        "trigger_counts": {},
+    }
+
+def _add_to_rollup(rollup: Dict, mood: str, intensity: int, hour: int,
+                   triggers: Optional[List[str]]):
+    rollup["count"] += 1
+    rollup["intensity_sum"] += intensity
+    rollup["intensity_sumsq"] += intensity * intensity
+    rollup["mood_counts"][mood] = rollup["mood_counts"].get(mood, 0) + 1
+    rollup["hour_counts"][hour] += 1
+    rollup["hour_sums"][hour] += intensity
+    for trigger in triggers or []:
+        rollup["trigger_counts"][trigger] = rollup["trigger_counts"].get(trigger, 0) + 1
+
+def _rollup_from_row(row) -> Dict:
+    return {
+        "count": row[0],
+        "intensity_sum": row[1],
+        "intensity_sumsq": row[2],
+        "mood_counts": json.loads(row[3]),
+        "hour_counts": json.loads(row[4]),
+        "hour_sums": json.loads(row[5]),
+        "trigger_counts": json.loads(row[6]),
+    }
+
+def _save_rollups(cursor, rollups: Dict[Tuple[str, str], Dict]):
+    cursor.executemany("""
+        INSERT OR REPLACE INTO mood_daily_rollups
+        (user_id, day, count, intensity_sum, intensity_sumsq,
+         mood_counts, hour_counts, hour_sums, trigger_counts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (user_id, day, r["count"], r["intensity_sum"], r["intensity_sumsq"],
+         json.dumps(r["mood_counts"]), json.dumps(r["hour_counts"]),
+         json.dumps(r["hour_sums"]), json.dumps(r["trigger_counts"]))
+        for (user_id, day), r in rollups.items()
+    ])
+
+def _record_mood_rollups(cursor, entries: List[tuple]):
+    """
+    Count new mood entries into their days' rollups (call inside the
+    transaction that writes them)
+    
+    Args:
+        entries: (user_id, epoch, mood, intensity, triggers list) tuples;
+            entries without an epoch are skipped
+    """
+    rollups: Dict[Tuple[str, str], Dict] = {}
+    for user_id, epoch, mood, intensity, triggers in entries:
+        if epoch is None:
+            continue
+        moment = datetime.fromtimestamp(epoch)
+        key = (user_id, moment.strftime("%Y-%m-%d"))
+        rollup = rollups.get(key)
+        if rollup is None:
+            cursor.execute("""
+                SELECT count, intensity_sum, intensity_sumsq, mood_counts, hour_counts, hour_sums, trigger_counts
+                FROM mood_daily_rollups
+                WHERE user_id = ? AND day = ?
+            """, key)
+            row = cursor.fetchone()
+            rollup = rollups[key] = _rollup_from_row(row) if row else _empty_rollup()
+        _add_to_rollup(rollup, mood, intensity, moment.hour, triggers)
+    _save_rollups(cursor, rollups)
+
+def _rebuild_mood_rollups(cursor):
+    """Recompute every rollup from mood_entries (when the table is created)"""
+    cursor.execute("DELETE FROM mood_daily_rollups")
+    cursor.execute("SELECT user_id, mood, intensity, triggers, ts FROM mood_entries WHERE ts IS NOT NULL")
+    rollups: Dict[Tuple[str, str], Dict] = {}
+    for user_id, mood, intensity, triggers, epoch in cursor.fetchall():
+        moment = datetime.fromtimestamp(epoch)
+        rollup = rollups.setdefault((user_id, moment.strftime("%Y-%m-%d")), _empty_rollup())
+        _add_to_rollup(rollup, mood, intensity, moment.hour,
+                       json.loads(triggers) if triggers else None)
+    _save_rollups(cursor, rollups)
+
+def get_mood_rollups(user_id: str, start_day: str) -> List[Dict]:
+    """
+    Get a user's daily mood rollups from start_day (YYYY-MM-DD) on, newest first
+    
+    Each has day, count, intensity_sum, intensity_sumsq, mood_counts,
+    hour_counts/hour_sums (24 local hours) and trigger_counts.
+    """
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT count, intensity_sum, intensity_sumsq, mood_counts, hour_counts, hour_sums,
+                   trigger_counts, day
+            FROM mood_daily_rollups
+            WHERE user_id = ? AND day >= ?
+            ORDER BY day DESC
+        """, (user_id, start_day))
+        rollups = []
+        for row in cursor.fetchall():
+            rollup = _rollup_from_row(row)
+            rollup["day"] = row[7]
+            rollups.append(rollup)
+    return rollups
+
 # ══════════════════════════════════════════════════════════════
 # SUMMARY STORAGE FUNCTIONS - NEW
 # ══════════════════════════════════════════════════════════════
 
 def save_daily_summary(user_id: str, date: str, summary: str, message_count: int):
     """Save or update a daily summary"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO daily_summaries 
-        (user_id, date, summary, message_count, generated_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        date,
-        summary,
-        message_count,
-        str(datetime.now())
-    ))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT OR REPLACE INTO daily_summaries 
+            (user_id, date, summary, message_count, generated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            user_id,
+            date,
+            summary,
+            message_count,
+            str(datetime.now())
+        ))
     print(f"📝 Daily summary saved for {user_id} on {date}")
 
-def get_daily_summaries(user_id: str, limit: int = 30) -> Dict[str, Dict]:
-    """Get daily summaries for a user (returns dict keyed by date)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT date, summary, message_count, generated_at
-        FROM daily_summaries
-        WHERE user_id = ?
-        ORDER BY date DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    summaries = {}
-    for row in cursor.fetchall():
-        summaries[row[0]] = {
-            "summary": row[1],
-            "message_count": row[2],
-            "generated_at": row[3]
-        }
-    
-    conn.close()
+def get_daily_summaries(user_id: str, limit: Optional[int] = 30) -> Dict[str, Dict]:
+    """Get daily summaries for a user (returns dict keyed by date, limit=None for all)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT date, summary, message_count, generated_at
+            FROM daily_summaries
+            WHERE user_id = ?
+            ORDER BY date DESC
+            LIMIT ?
+        """, (user_id, -1 if limit is None else limit))
+    
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "summary": row[1],
+                "message_count": row[2],
+                "generated_at": row[3]
+            }
     return summaries
 
 def save_weekly_summary(user_id: str, week_key: str, week_start: str, 
                        summary: str, days_count: int):
     """Save or update a weekly summary"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO weekly_summaries 
-        (user_id, week_key, week_start, summary, days_count, generated_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        week_key,
-        week_start,
-        summary,
-        days_count,
-        str(datetime.now())
-    ))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT OR REPLACE INTO weekly_summaries 
+            (user_id, week_key, week_start, summary, days_count, generated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            user_id,
+            week_key,
+            week_start,
+            summary,
+            days_count,
+            str(datetime.now())
+        ))
     print(f"📅 Weekly summary saved for {user_id} - {week_key}")
 
-def get_weekly_summaries(user_id: str, limit: int = 12) -> Dict[str, Dict]:
-    """Get weekly summaries for a user (returns dict keyed by week_key)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT week_key, week_start, summary, days_count, generated_at
-        FROM weekly_summaries
-        WHERE user_id = ?
-        ORDER BY week_key DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    summaries = {}
-    for row in cursor.fetchall():
-        summaries[row[0]] = {
-            "week_start": row[1],
-            "summary": row[2],
-            "days_count": row[3],
-            "generated_at": row[4]
-        }
-    
-    conn.close()
+def get_weekly_summaries(user_id: str, limit: Optional[int] = 12) -> Dict[str, Dict]:
+    """Get weekly summaries for a user (returns dict keyed by week_key, limit=None for all)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT week_key, week_start, summary, days_count, generated_at
+            FROM weekly_summaries
+            WHERE user_id = ?
+            ORDER BY week_key DESC
+            LIMIT ?
+        """, (user_id, -1 if limit is None else limit))
+    
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "week_start": row[1],
+                "summary": row[2],
+                "days_count": row[3],
+                "generated_at": row[4]
+            }
     return summaries
 
 def save_monthly_summary(user_id: str, month_key: str, summary: str, weeks_count: int):
     """Save or update a monthly summary"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO monthly_summaries 
-        (user_id, month_key, summary, weeks_count, generated_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        month_key,
-        summary,
-        weeks_count,
-        str(datetime.now())
-    ))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT OR REPLACE INTO monthly_summaries 
+            (user_id, month_key, summary, weeks_count, generated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            user_id,
+            month_key,
+            summary,
+            weeks_count,
+            str(datetime.now())
+        ))
     print(f"📆 Monthly summary saved for {user_id} - {month_key}")
 
-def get_monthly_summaries(user_id: str, limit: int = 12) -> Dict[str, Dict]:
-    """Get monthly summaries for a user (returns dict keyed by month_key)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT month_key, summary, weeks_count, generated_at
-        FROM monthly_summaries
-        WHERE user_id = ?
-        ORDER BY month_key DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    summaries = {}
-    for row in cursor.fetchall():
-        summaries[row[0]] = {
-            "summary": row[1],
-            "weeks_count": row[2],
-            "generated_at": row[3]
-        }
-    
-    conn.close()
+def get_monthly_summaries(user_id: str, limit: Optional[int] = 12) -> Dict[str, Dict]:
+    """Get monthly summaries for a user (returns dict keyed by month_key, limit=None for all)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT month_key, summary, weeks_count, generated_at
+            FROM monthly_summaries
+            WHERE user_id = ?
+            ORDER BY month_key DESC
+            LIMIT ?
+        """, (user_id, -1 if limit is None else limit))
+    
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "summary": row[1],
+                "weeks_count": row[2],
+                "generated_at": row[3]
+            }
     return summaries
 
 def load_all_summaries(user_id: str) -> Dict:
@@ -649,53 +1581,120 @@ def load_all_summaries(user_id: str) -> Dict:
         "monthly": get_monthly_summaries(user_id)
     }
 
+def get_daily_summaries_between(user_id: str, start_date: str, end_date: str) -> Dict[str, Dict]:
+    """Get daily summaries with start_date <= date <= end_date (YYYY-MM-DD, inclusive)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT date, summary, message_count, generated_at
+            FROM daily_summaries
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date ASC
+        """, (user_id, start_date, end_date))
+    
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "summary": row[1],
+                "message_count": row[2],
+                "generated_at": row[3]
+            }
+    return summaries
+
+def get_weekly_summaries_between(user_id: str, start_date: str, end_date: str) -> Dict[str, Dict]:
+    """Get weekly summaries whose week_start falls in [start_date, end_date]"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT week_key, week_start, summary, days_count, generated_at
+            FROM weekly_summaries
+            WHERE user_id = ? AND week_start BETWEEN ? AND ?
+            ORDER BY week_start ASC
+        """, (user_id, start_date, end_date))
+    
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "week_start": row[1],
+                "summary": row[2],
+                "days_count": row[3],
+                "generated_at": row[4]
+            }
+    return summaries
+
+def get_context_summaries(user_id: str, day: str, weeks: int = 2) -> Dict:
+    """
+    Load just the summaries the chat prompt uses: the daily summary for
+    `day`, the latest `weeks` weekly summaries and the latest monthly one.
+    Same shape as load_all_summaries.
+    """
+    return {
+        "daily": get_daily_summaries_between(user_id, day, day),
+        "weekly": get_weekly_summaries(user_id, limit=weeks),
+        "monthly": get_monthly_summaries(user_id, limit=1)
+    }
+
+def get_summary_watermark(user_id: str) -> int:
+    """Get the last chat seq already folded into daily summaries (0 if none)"""
+    with read_cursor() as cursor:
+        cursor.execute(
+            "SELECT last_seq FROM summary_watermarks WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+def set_summary_watermark(user_id: str, last_seq: int):
+    """Record the last chat seq folded into daily summaries"""
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO summary_watermarks (user_id, last_seq, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_seq = excluded.last_seq,
+                updated_at = excluded.updated_at
+        """, (user_id, last_seq, str(datetime.now())))
+
 def delete_old_summaries(user_id: str, days: int = 90):
     """Delete summaries older than specified days"""
-    from datetime import timedelta
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-    
-    # Delete old daily summaries
-    cursor.execute("""
-        DELETE FROM daily_summaries
-        WHERE user_id = ? AND date < ?
-    """, (user_id, cutoff_date))
-    daily_deleted = cursor.rowcount
-    
-    # Delete old weekly summaries (keep more weeks)
-    cutoff_week = (datetime.now() - timedelta(days=days+30)).strftime("%Y-W%W")
-    cursor.execute("""
-        DELETE FROM weekly_summaries
-        WHERE user_id = ? AND week_key < ?
-    """, (user_id, cutoff_week))
-    weekly_deleted = cursor.rowcount
-    
-    # Keep all monthly summaries (they're already condensed)
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+        # Delete old daily summaries
+        cursor.execute("""
+            DELETE FROM daily_summaries
+            WHERE user_id = ? AND date < ?
+        """, (user_id, cutoff_date))
+        daily_deleted = cursor.rowcount
+    
+        # Delete old weekly summaries (keep more weeks)
+        cutoff_week = (datetime.now() - timedelta(days=days+30)).strftime("%Y-W%W")
+        cursor.execute("""
+            DELETE FROM weekly_summaries
+            WHERE user_id = ? AND week_key < ?
+        """, (user_id, cutoff_week))
+        weekly_deleted = cursor.rowcount
+    
+        # Keep all monthly summaries (they're already condensed)
     
     print(f"🧹 Deleted {daily_deleted} daily and {weekly_deleted} weekly summaries for {user_id}")
     return {"daily": daily_deleted, "weekly": weekly_deleted}
 
 def delete_user_data(user_id: str):
     """Delete all user data including summaries"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM mood_transitions WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM mood_entries WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM daily_summaries WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM weekly_summaries WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM monthly_summaries WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM calendar_events WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM chat_messages WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM mood_transitions WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM mood_entries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM daily_summaries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM weekly_summaries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM monthly_summaries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM summary_watermarks WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM calendar_events WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM user_active_days WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM mood_daily_rollups WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+        _after_commit("mood_transitions_invalidated", user_id)
+    invalidate_user_cache(user_id)
     
     print(f"🗑️ Deleted all data for user {user_id}")
 
@@ -708,81 +1707,415 @@ def save_calendar_event(user_id: str, event_id: str, google_event_id: Optional[s
                         end_time: str, category: Optional[str] = None, 
                         source: Optional[str] = None):
     """Save a calendar event to database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO calendar_events 
-        (id, user_id, google_event_id, title, description, start_time, end_time, category, source, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        event_id,
-        user_id,
-        google_event_id,
-        title,
-        description,
-        start_time,
-        end_time,
-        category,
-        source,
-        str(datetime.now())
-    ))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT OR REPLACE INTO calendar_events 
+            (id, user_id, google_event_id, title, description, start_time, end_time, category, source, created_at, start_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            event_id,
+            user_id,
+            google_event_id,
+            title,
+            description,
+            start_time,
+            end_time,
+            category,
+            source,
+            str(datetime.now()),
+            to_epoch(start_time)
+        ))
     print(f"📅 Calendar event saved: {title} for user {user_id}")
 
-def get_calendar_events(user_id: str, limit: int = 50, days_ahead: int = 30) -> List[Dict]:
-    """Get calendar events for a user"""
-    from datetime import timedelta
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get events from now up to days_ahead
-    cutoff_time = datetime.now()
-    future_time = datetime.now() + timedelta(days=days_ahead)
-    
-    cursor.execute("""
-        SELECT id, google_event_id, title, description, start_time, end_time, category, source, created_at
-        FROM calendar_events
-        WHERE user_id = ? AND start_time >= ? AND start_time <= ?
-        ORDER BY start_time ASC
-        LIMIT ?
-    """, (user_id, str(cutoff_time), str(future_time), limit))
-    
-    events = []
-    for row in cursor.fetchall():
-        events.append({
-            "id": row[0],
-            "google_event_id": row[1],
-            "title": row[2],
-            "description": row[3],
-            "start_time": row[4],
-            "end_time": row[5],
-            "category": row[6],
-            "source": row[7],
-            "created_at": row[8]
-        })
+def get_calendar_events(user_id: str, limit: int = 50, days_ahead: int = 30,
+                        after: Optional[Tuple[int, str]] = None) -> List[Dict]:
+    """
+    Get upcoming calendar events for a user, soonest first
     
-    conn.close()
+    Pass the (start_ts, id) of the last event of the previous page as
+    after to continue from it.
+    """
+    with read_cursor() as cursor:
+        # Get events from now up to days_ahead
+        now = datetime.now()
+        cutoff = to_epoch(now)
+        future = to_epoch(now + timedelta(days=days_ahead))
+        after_start, after_id = after or (cutoff, "")
+    
+        cursor.execute("""
+            SELECT id, google_event_id, title, description, start_time, end_time, category, source, created_at, start_ts
+            FROM calendar_events
+            WHERE user_id = ? AND start_ts >= ? AND start_ts <= ?
+              AND (start_ts, id) > (?, ?)
+            ORDER BY start_ts ASC, id ASC
+            LIMIT ?
+        """, (user_id, cutoff, future, after_start, after_id, limit))
+    
+        events = []
+        for row in cursor.fetchall():
+            events.append({
+                "id": row[0],
+                "google_event_id": row[1],
+                "title": row[2],
+                "description": row[3],
+                "start_time": row[4],
+                "end_time": row[5],
+                "category": row[6],
+                "source": row[7],
+                "created_at": row[8],
+                "start_ts": row[9]
+            })
     return events
 
 def delete_calendar_event(user_id: str, event_id: str):
     """Delete a calendar event"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        DELETE FROM calendar_events
-        WHERE user_id = ? AND id = ?
-    """, (user_id, event_id))
+    with transaction() as cursor:
+        cursor.execute("""
+            DELETE FROM calendar_events
+            WHERE user_id = ? AND id = ?
+        """, (user_id, event_id))
     
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+        deleted = cursor.rowcount
     
     if deleted > 0:
         print(f"🗑️ Deleted calendar event {event_id} for user {user_id}")
     
-    return deleted > 0
\ No newline at end of file
+    return deleted > 0
+
+# ══════════════════════════════════════════════════════════════
+# BACKGROUND JOB QUEUE
+# ══════════════════════════════════════════════════════════════
+
+def enqueue_job(kind: str, job_key: str, payload: Optional[Dict] = None):
+    """
+    Queue a job, deduplicated on (kind, job_key)
+    
+    A job that is already pending is left as is. A job that is currently
+    running is flagged to run once more after it finishes, so work queued
+    mid-run isn't lost.
+    """
+    now = str(datetime.now())
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO background_jobs (kind, job_key, payload, enqueued_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (kind, job_key) DO UPDATE SET
+                payload = excluded.payload,
+                rerun = CASE WHEN status = 'running' THEN 1 ELSE rerun END,
+                status = CASE WHEN status = 'failed' THEN 'pending' ELSE status END,
+                attempts = CASE WHEN status = 'failed' THEN 0 ELSE attempts END,
+                updated_at = excluded.updated_at
+        """, (kind, job_key, json.dumps(payload) if payload else None, now, now))
+
+def claim_jobs(kind: str, limit: int) -> List[Dict]:
+    """Mark up to limit pending jobs of a kind as running and return them (oldest first)"""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT job_key, payload, attempts
+            FROM background_jobs
+            WHERE kind = ? AND status = 'pending'
+            ORDER BY enqueued_at
+            LIMIT ?
+        """, (kind, limit))
+        rows = cursor.fetchall()
+    
+        cursor.executemany("""
+            UPDATE background_jobs
+            SET status = 'running', rerun = 0, updated_at = ?
+            WHERE kind = ? AND job_key = ?
+        """, [(str(datetime.now()), kind, row[0]) for row in rows])
+    
+    return [
+        {
+            "kind": kind,
+            "job_key": row[0],
+            "payload": json.loads(row[1]) if row[1] else None,
+            "attempts": row[2]
+        }
+        for row in rows
+    ]
+
+def complete_job(kind: str, job_key: str):
+    """Finish a running job, re-queueing it if it was enqueued again meanwhile"""
+    with transaction() as cursor:
+        cursor.execute("""
+            DELETE FROM background_jobs
+            WHERE kind = ? AND job_key = ? AND rerun = 0
+        """, (kind, job_key))
+        cursor.execute("""
+            UPDATE background_jobs
+            SET status = 'pending', rerun = 0, attempts = 0, updated_at = ?
+            WHERE kind = ? AND job_key = ?
+        """, (str(datetime.now()), kind, job_key))
+
+def fail_job(kind: str, job_key: str, error: str, max_attempts: int = 3):
+    """Record a failed attempt; the job goes back to pending until max_attempts"""
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE background_jobs
+            SET attempts = attempts + 1,
+                status = CASE WHEN attempts + 1 >= ? AND rerun = 0 THEN 'failed' ELSE 'pending' END,
+                rerun = 0,
+                last_error = ?,
+                updated_at = ?
+            WHERE kind = ? AND job_key = ?
+        """, (max_attempts, error, str(datetime.now()), kind, job_key))
+
+def reset_running_jobs() -> int:
+    """Put jobs left 'running' by a previous process back to pending"""
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE background_jobs
+            SET status = 'pending', updated_at = ?
+            WHERE status = 'running'
+        """, (str(datetime.now()),))
+        reset = cursor.rowcount
+    
+    if reset:
+        print(f"♻️ Re-queued {reset} interrupted background jobs")
+    return reset
+
+# ══════════════════════════════════════════════════════════════
+# MOOD ANALYSIS CACHE
+# ══════════════════════════════════════════════════════════════
+
+def get_cached_mood_analysis(cache_key: str, now: float) -> Optional[Tuple[Dict, float]]:
+    """Get an unexpired cached mood analysis as (result, expires_at)"""
+    with read_cursor() as cursor:
+        cursor.execute("""
+            SELECT result, expires_at
+            FROM mood_analysis_cache
+            WHERE cache_key = ? AND expires_at > ?
+        """, (cache_key, now))
+        row = cursor.fetchone()
+    return (json.loads(row[0]), row[1]) if row else None
+
+def save_cached_mood_analysis(cache_key: str, result: Dict, expires_at: float):
+    """Store a mood analysis in the persistent cache"""
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT OR REPLACE INTO mood_analysis_cache (cache_key, result, expires_at)
+            VALUES (?, ?, ?)
+        """, (cache_key, json.dumps(result), expires_at))
+
+def purge_mood_analysis_cache(now: float) -> int:
+    """Delete expired cache rows"""
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM mood_analysis_cache WHERE expires_at <= ?", (now,))
+        deleted = cursor.rowcount
+    
+    if deleted:
+        print(f"🧹 Purged {deleted} expired mood cache entries")
+    return deleted
+
+# ══════════════════════════════════════════════════════════════
+# EXPORT
+# ══════════════════════════════════════════════════════════════
+
+# (record type, table, sort key) in export order; every column but user_id is exported
+_EXPORT_TABLES = [
+    ("chat_message", "chat_messages", "seq"),
+    ("mood_entry", "mood_entries", "ts, id"),
+    ("mood_transition", "mood_transitions", "id"),
+    ("daily_summary", "daily_summaries", "date"),
+    ("weekly_summary", "weekly_summaries", "week_key"),
+    ("monthly_summary", "monthly_summaries", "month_key"),
+    ("calendar_event", "calendar_events", "start_ts, id"),
+]
+
+def iter_user_export(user_id: str, batch_size: int = 500) -> Iterator[Dict]:
+    """
+    Yield every row belonging to a user as {"type": ..., **columns} dicts
+    
+    Starts with a {"type": "user", "data": ...} record, then each table in
+    _EXPORT_TABLES order. Rows are pulled batch_size at a time from one
+    read transaction on a dedicated read-only connection, so the export is
+    a consistent snapshot and memory stays flat however many rows there
+    are. The connection isn't thread-bound, so the generator can be
+    advanced from different worker threads (as StreamingResponse does).
+    """
+    uri = f"{Path(DB_PATH).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False)
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT data FROM users WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        if row:
+            data = json.loads(row[0])
+            for key in LEGACY_BLOB_KEYS:
+                data.pop(key, None)
+            yield {"type": "user", "user_id": user_id, "data": data}
+        
+        for record_type, table, order_by in _EXPORT_TABLES:
+            cursor.execute(
+                f"SELECT * FROM {table} WHERE user_id = ? ORDER BY {order_by}",
+                (user_id,)
+            )
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for values in rows:
+                    record = {"type": record_type}
+                    record.update(
+                        (col, val) for col, val in zip(columns, values) if col != "user_id"
+                    )
+                    for key in ("triggers", "analysis"):
+                        if record.get(key):
+                            record[key] = json.loads(record[key])
+                    yield record
+        conn.rollback()
+    finally:
+        conn.close()
+
+# ══════════════════════════════════════════════════════════════
+# BULK IMPORT
+# ══════════════════════════════════════════════════════════════
+
+def scoped_mood_entry_id(user_id: str, entry_id: str) -> str:
+    """
+    Stable id for a copy of another user's mood entry (e.g. one user's
+    export imported into another account), so repeating the import still
+    finds the copies
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"mood-entry:{user_id}/{entry_id}"))
+
+def _new_mood_entries(cursor, rows: List[tuple]) -> List[tuple]:
+    """
+    Rows from an import batch that the owning user doesn't have yet
+    
+    Entry ids are global, so an id already held by a different user is
+    re-keyed with scoped_mood_entry_id rather than treated as a duplicate.
+    """
+    new, seen = [], set()
+    for row in rows:
+        entry_id, user_id = row[0], row[1]
+        cursor.execute("SELECT user_id FROM mood_entries WHERE id = ?", (entry_id,))
+        found = cursor.fetchone()
+        if found and found[0] != user_id:
+            entry_id = scoped_mood_entry_id(user_id, entry_id)
+            row = (entry_id,) + tuple(row[1:])
+            cursor.execute("SELECT user_id FROM mood_entries WHERE id = ?", (entry_id,))
+            found = cursor.fetchone()
+        if found or entry_id in seen:
+            continue
+        seen.add(entry_id)
+        new.append(row)
+    return new
+
+def _new_mood_transitions(cursor, rows: List[tuple]) -> List[tuple]:
+    """
+    Rows from an import batch that aren't stored yet, matched on
+    (user, timestamp, mood, intensity, message)
+    """
+    new, seen = [], set()
+    for row in rows:
+        user_id, mood, intensity, message, _, timestamp, ts = row
+        key = (user_id, ts, timestamp, mood, intensity, message)
+        if key in seen:
+            continue
+        seen.add(key)
+        cursor.execute("""
+            SELECT 1 FROM mood_transitions
+            WHERE user_id = ? AND ts = ? AND timestamp = ?
+              AND mood = ? AND intensity = ? AND message IS ?
+            LIMIT 1
+        """, key)
+        if cursor.fetchone() is None:
+            new.append(row)
+    return new
+
+def _new_chat_messages(cursor, user_id: str, messages: List[Dict]) -> List[Dict]:
+    """Messages from an import batch the user doesn't have yet, matched on (ts, role, text)"""
+    stamps = [msg["timestamp"] for msg in messages if msg.get("timestamp")]
+    existing = set()
+    if stamps:
+        # One pass over the user's messages in the batch's time range
+        cursor.execute("""
+            SELECT ts, role, text FROM chat_messages
+            WHERE user_id = ? AND ts BETWEEN ? AND ?
+        """, (user_id, min(stamps), max(stamps)))
+        existing = set(cursor.fetchall())
+    
+    new = []
+    for msg in messages:
+        key = (msg.get("timestamp"), msg.get("role", "user"), msg.get("text", ""))
+        if key[0] and key in existing:
+            continue
+        existing.add(key)
+        new.append(msg)
+    return new
+
+def import_batch(mood_entries: List[tuple], mood_transitions: List[tuple],
+                 chat_messages: Dict[str, List[Dict]],
+                 enrichment_job: Optional[str] = None) -> Dict[str, int]:
+    """
+    Insert one batch of imported rows in a single transaction
+    
+    Rows the user already has are skipped, so importing the same export
+    twice adds nothing the second time.
+    
+    Args:
+        mood_entries: (id, user_id, mood, intensity, notes, triggers_json, analysis_json,
+            timestamp, ts) rows; deduplicated per user on id (see _new_mood_entries)
+        mood_transitions: (user_id, mood, intensity, message, context, timestamp, ts)
+            rows; deduplicated on (user, timestamp, mood, intensity, message)
+        chat_messages: user_id -> messages, appended after the user's current
+            history; deduplicated on (timestamp, role, text)
+        enrichment_job: Job kind to queue, in the same transaction, for every
+            new entry with notes
+    
+    Returns:
+        Rows inserted per record type
+    """
+    with transaction() as cursor:
+        mood_entries = _new_mood_entries(cursor, mood_entries)
+        cursor.executemany("""
+            INSERT INTO mood_entries
+            (id, user_id, mood, intensity, notes, triggers, analysis, timestamp, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, mood_entries)
+        entries_by_user: Dict[str, List[tuple]] = {}
+        for row in mood_entries:
+            entries_by_user.setdefault(row[1], []).append(row)
+        for user_id, rows in entries_by_user.items():
+            _record_user_activity(cursor, user_id, {row[-1] for row in rows},
+                                  mood_entry_count=len(rows))
+        _record_mood_rollups(cursor, [
+            (row[1], row[8], row[2], row[3], json.loads(row[5]) if row[5] else None)
+            for row in mood_entries
+        ])
+        if enrichment_job:
+            for row in mood_entries:
+                if row[4]:
+                    enqueue_job(enrichment_job, row[0])
+        
+        mood_transitions = _new_mood_transitions(cursor, mood_transitions)
+        cursor.executemany("""
+            INSERT INTO mood_transitions (user_id, mood, intensity, message, context, timestamp, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, mood_transitions)
+        transitions_by_user: Dict[str, List[tuple]] = {}
+        for row in mood_transitions:
+            transitions_by_user.setdefault(row[0], []).append(row)
+        for user_id, rows in transitions_by_user.items():
+            _record_user_activity(cursor, user_id, {row[-1] for row in rows},
+                                  transition_count=len(rows))
+            _after_commit("mood_transitions_invalidated", user_id)
+        
+        messages_inserted = 0
+        for user_id, messages in chat_messages.items():
+            messages = _new_chat_messages(cursor, user_id, messages)
+            if messages:
+                _insert_chat_messages(cursor, user_id, messages)
+                messages_inserted += len(messages)
+    
+    return {
+        "mood_entry": len(mood_entries),
+        "mood_transition": len(mood_transitions),
+        "chat_message": messages_inserted,
+    }
@@ -0,0 +1,187 @@
+"""
+Keyword Matcher
+Finds crisis, mood, intensity and calendar keywords in one pass of a single
+compiled regex
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+# ══════════════════════════════════════════════════════════════
+# KEYWORD LISTS
+# ══════════════════════════════════════════════════════════════
+
+# Crisis keywords detection
+CRISIS_KEYWORDS = [
+    "kill myself",
+    "suicide",
+    "end it all",
+    "want to die",
+    "better off dead",
+    "hurt myself",
+    "self harm",
+    "cut myself",
+    "overdose",
+    "jump off",
+]
+
+# Mood detection keywords
+MOOD_KEYWORDS = {
+    "anxious": ["anxious", "anxiety", "worried", "nervous", "panic", "stressed"],
+    "depressed": ["depressed", "depression", "hopeless", "worthless", "empty", "numb"],
+    "sad": ["sad", "down", "unhappy", "miserable", "crying", "tears"],
+    "angry": ["angry", "mad", "frustrated", "furious", "rage", "pissed"],
+    "happy": ["happy", "joy", "good", "great", "wonderful", "amazing"],
+    "calm": ["calm", "peaceful", "relaxed", "serene", "content"],
+}
+
+# Strong emotional words that raise estimated intensity
+INTENSITY_KEYWORDS = [
+    "really",
+    "very",
+    "terrible",
+    "horrible",
+    "overwhelmed",
+    "extremely",
+    "fucking",
+    "so much",
+]
+
+# Calendar intent keywords
+CALENDAR_KEYWORDS = [
+    "schedule",
+    "appointment",
+    "meeting",
+    "reminder",
+    "calendar",
+    "book",
+    "plan",
+    "set up",
+    "arrange",
+    "therapy",
+    "meditation",
+]
+
+TIME_KEYWORDS = [
+    "tomorrow",
+    "today",
+    "next week",
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+    "at",
+    "pm",
+    "am",
+]
+
+# ══════════════════════════════════════════════════════════════
+# MATCHER
+# ══════════════════════════════════════════════════════════════
+
+
+class KeywordHit(NamedTuple):
+    category: str  # "crisis", "mood", "intensity", "calendar" or "time"
+    label: str  # mood name for "mood" hits, otherwise the keyword itself
+    keyword: str
+    start: int
+    end: int
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.split(r"[\s\-]+", text.lower()))
+
+
+def _trie_pattern(node: Dict) -> str:
+    """
+    Regex alternation for a character trie of normalized keywords
+
+    Factoring shared prefixes keeps the work per start position to one
+    literal check per distinct next character. A space in a keyword matches
+    any run of whitespace/hyphens. A keyword's end needs a letter boundary,
+    so "made" isn't "mad", except for crisis phrases, which keep matching
+    inflections ("overdosed"). Longer keywords are tried before a shorter
+    one ending at the same node.
+    """
+    alternatives = []
+    for char in sorted(k for k in node if k):
+        head = r"[\s\-]+" if char == " " else re.escape(char)
+        alternatives.append(head + _trie_pattern(node[char]))
+    if "" in node:
+        alternatives.append("" if node[""] else "(?![a-z])")
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+def _build() -> Tuple[re.Pattern, re.Pattern, Dict[str, List[Tuple[str, str, str]]]]:
+    entries = [("crisis", kw, kw) for kw in CRISIS_KEYWORDS]
+    for mood, keywords in MOOD_KEYWORDS.items():
+        entries += [("mood", mood, kw) for kw in keywords]
+    entries += [("intensity", kw, kw) for kw in INTENSITY_KEYWORDS]
+    entries += [("calendar", kw, kw) for kw in CALENDAR_KEYWORDS]
+    entries += [("time", kw, kw) for kw in TIME_KEYWORDS]
+
+    # Normalized keyword -> every (category, label, keyword) that lists it
+    owners: Dict[str, List[Tuple[str, str, str]]] = {}
+    for category, label, keyword in entries:
+        owners.setdefault(_normalize(keyword), []).append((category, label, keyword))
+
+    crisis = {_normalize(kw) for kw in CRISIS_KEYWORDS}
+    trie: Dict = {}
+    for keyword in owners:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = keyword in crisis
+
+    # Every keyword starts right after a non-letter (the text is scanned
+    # with a space prepended). Leading with that character class lets re
+    # skip through the letters of each word in C and only try the trie at
+    # word starts.
+    pattern = r"[^a-z](" + _trie_pattern(trie) + ")"
+    return re.compile(pattern), re.compile(pattern, re.IGNORECASE), owners
+
+
+_PATTERN, _PATTERN_I, _OWNERS = _build()
+
+
+@lru_cache(maxsize=256)
+def scan_message(message: str) -> Tuple[KeywordHit, ...]:
+    """
+    Find every crisis, mood, intensity and calendar keyword hit in a message
+
+    One search over the lowercased message with a single pattern holding
+    every keyword; each match's text maps back to the keywords (and
+    categories) it belongs to. Results are cached per message so
+    detect_crisis, detect_mood, estimate_intensity and
+    detect_calendar_intent on the same text share one scan.
+
+    Returns:
+        Hits sorted by position; spans index into the original message
+    """
+    lower = message.lower()
+    # lower() can change length for a few non-ASCII characters; match the
+    # original case-insensitively then so spans stay valid
+    if len(lower) == len(message):
+        matches = _PATTERN.finditer(" " + lower)
+    else:
+        matches = _PATTERN_I.finditer(" " + message)
+
+    hits = []
+    for match in matches:
+        start, end = match.span(1)
+        for category, label, keyword in _OWNERS[_normalize(match.group(1))]:
+            hits.append(KeywordHit(category, label, keyword, start - 1, end - 1))
+    return tuple(hits)
+
+
+def find_keywords(message: str, category: str) -> List[KeywordHit]:
+    """Hits of one category, in message order"""
+    if not message:
+        return []
+    return [hit for hit in scan_message(message) if hit.category == category]
@@ -3,16 +3,25 @@ Mental Health Support Chatbot - FastAPI Backend
 Main server file with REST API endpoints
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Optional, List, Dict
 import uvicorn
 from datetime import datetime
+import time
 import uuid
+import json
 import database as db
+import async_database as adb
+import background_jobs as jobs
+import bulk_import
 import chatbot_engine as chat
 import mood_tracker as mood
+import mood_cache
+import mood_live
+import mood_events
 import wellness as well
 import spotify_integration as sp
 import calendar_integration as cal
@@ -32,6 +41,24 @@ app.add_middleware(
 
 # Initialize database
 db.init_db()
+db.migrate_history_blobs()
+db.backfill_epoch_columns()
+db.purge_mood_analysis_cache(time.time())
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    mood_events.bind_loop(asyncio.get_running_loop())
+    await jobs.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_data_access():
+    mood_events.bind_loop(None)
+    await jobs.stop()
+    await chat.close_client()
+    adb.shutdown()
+
 
 # ══════════════════════════════════════════════════════════════
 # REQUEST/RESPONSE MODELS
@@ -91,45 +118,20 @@ async def chat_endpoint(request: ChatRequest):
     """
     try:
         # Load user data
-        user_data = db.load_user_data(request.user_id)
+        user_data = await adb.get_or_create_user(request.user_id)
         # Generate session_id if not provided
         session_id = request.session_id or str(uuid.uuid4())
 
         # Add user message to history
-
-        user_data["history"].append(
-            {"role": "user", "text": request.message, "timestamp": str(datetime.now())}
-        )
+        await adb.append_chat_message(request.user_id, "user", request.message)
 
         # Generate response with mood tracking
         response_data = await chat.generate_support_response(
             user_data=user_data, user_message=request.message, user_id=request.user_id
         )
 
-        # Add bot response to history
-        user_data["history"].append(
-            {
-                "role": "assistant",
-                "text": response_data["response"],
-                "timestamp": str(datetime.now()),
-            }
-        )
-
-        # Track mood in session if detected
-        if response_data.get("mood_detected"):
-            user_data.setdefault("current_session_moods", []).append(
-                {
-                    "mood": response_data.get("mood_detected"),
-                    "intensity": response_data.get("mood_intensity"),
-                    "timestamp": str(datetime.now()),
-                }
-            )
-
-        # Update last activity
-        user_data["last_activity"] = str(datetime.now())
-
-        # Save user data
-        db.save_user_data(request.user_id, user_data)
+        # Add bot response to history and save user data
+        await record_reply(request.user_id, user_data, response_data)
 
         # Return response
         return ChatResponse(
@@ -146,19 +148,136 @@ async def chat_endpoint(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events)
+
+    Emits `delta` events with partial reply text, then one `final` event
+    with the full ChatResponse payload. The reply is saved to history before
+    the final event, even if the client disconnects mid-stream.
+    """
+    try:
+        user_data = await adb.get_or_create_user(request.user_id)
+        session_id = request.session_id or str(uuid.uuid4())
+
+        await adb.append_chat_message(request.user_id, "user", request.message)
+        frames = stream_reply(user_data, request.message, request.user_id)
+    except Exception as e:
+        print(f"❌ Chat error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        try:
+            async for frame in frames:
+                if frame["type"] == "delta":
+                    yield sse_event("delta", {"text": frame["text"]})
+                    continue
+
+                response_data = {k: v for k, v in frame.items() if k != "type"}
+                yield sse_event(
+                    "final",
+                    ChatResponse(session_id=session_id, **response_data).model_dump(),
+                )
+        except Exception as e:
+            print(f"❌ Chat stream error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def record_reply(user_id: str, user_data: Dict, response_data: Dict):
+    """Persist the assistant's reply and the session mood once a turn completes"""
+    await adb.append_chat_message(user_id, "assistant", response_data["response"])
+
+    # Track mood in session if detected
+    if response_data.get("mood_detected"):
+        user_data.setdefault("current_session_moods", []).append(
+            {
+                "mood": response_data.get("mood_detected"),
+                "intensity": response_data.get("mood_intensity"),
+                "timestamp": str(datetime.now()),
+            }
+        )
+
+    # Update last activity
+    user_data["last_activity"] = str(datetime.now())
+
+    await adb.save_user_data(user_id, user_data)
+
+
+# Streamed replies still being generated (see stream_reply)
+_reply_tasks = set()
+
+
+def stream_reply(user_data: Dict, message: str, user_id: str) -> AsyncIterator[Dict]:
+    """
+    Frames of chat.stream_support_response, with the reply recorded before
+    the final frame is handed over
+
+    The reply is generated in a task of its own, so a client that disconnects
+    mid-stream only stops the sending: the reply is still finished and saved,
+    and history doesn't end on an unanswered message.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def generate():
+        try:
+            async for frame in chat.stream_support_response(
+                user_data=user_data, user_message=message, user_id=user_id
+            ):
+                if frame["type"] == "final":
+                    await record_reply(
+                        user_id, user_data, {k: v for k, v in frame.items() if k != "type"}
+                    )
+                queue.put_nowait(frame)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(generate())
+    _reply_tasks.add(task)
+    task.add_done_callback(_reply_tasks.discard)
+
+    async def frames():
+        while (frame := await queue.get()) is not None:
+            if isinstance(frame, Exception):
+                raise frame
+            yield frame
+
+    return frames()
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @app.get("/api/chat/history/{user_id}")
-async def get_chat_history(user_id: str, limit: int = 50):
+async def get_chat_history(
+    user_id: str, limit: int = Query(50, ge=1, le=200), before_seq: Optional[int] = None
+):
     """
-    Get user's chat history
+    Get user's chat history, newest page first
+
+    Pass next_before_seq from a response as before_seq to get the page
+    before it; next_before_seq is null once the start is reached.
     """
     try:
-        user_data = db.load_user_data(user_id)
-        history = user_data.get("history", [])
+        history = await adb.get_chat_history(
+            user_id, limit=limit, before_seq=before_seq
+        )
 
         return {
             "user_id": user_id,
-            "history": history[-limit:] if len(history) > limit else history,
-            "total_messages": len(history),
+            "history": history,
+            "total_messages": await adb.count_chat_messages(user_id),
+            "next_before_seq": history[0]["seq"] if len(history) == limit else None,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -170,10 +289,11 @@ async def clear_chat_history(user_id: str):
     Clear user's chat history
     """
     try:
-        user_data = db.load_user_data(user_id)
-        user_data["history"] = []
-        user_data["current_session_moods"] = []
-        db.save_user_data(user_id, user_data)
+        await adb.clear_chat_history(user_id)
+        user_data = await adb.get_user(user_id)
+        if user_data is not None:
+            user_data["current_session_moods"] = []
+            await adb.save_user_data(user_id, user_data)
 
         return {"success": True, "message": "Chat history cleared"}
     except Exception as e:
@@ -191,7 +311,7 @@ async def log_mood(entry: MoodEntry):
     Log a mood entry
     """
     try:
-        entry_id = mood.log_mood_entry(
+        entry_id = await mood.log_mood_entry(
             user_id=entry.user_id,
             mood=entry.mood,
             intensity=entry.intensity,
@@ -200,7 +320,7 @@ async def log_mood(entry: MoodEntry):
             entry_date=entry.date,
         )
 
-        insights = mood.get_mood_insights(entry.user_id)
+        insights = await adb.run_read(mood.get_mood_insights, entry.user_id)
 
         return MoodResponse(success=True, entry_id=entry_id, insights=insights)
     except Exception as e:
@@ -213,8 +333,8 @@ async def get_mood_history(user_id: str, days: int = 30):
     Get mood history for a user
     """
     try:
-        history = mood.get_mood_history(user_id, days=days)
-        insights = mood.get_mood_insights(user_id)
+        history = await adb.run_read(mood.get_mood_history, user_id, days=days)
+        insights = await adb.run_read(mood.get_mood_insights, user_id)
 
         return {"user_id": user_id, "history": history, "insights": insights}
     except Exception as e:
@@ -227,7 +347,7 @@ async def get_mood_by_date(user_id: str, date: str):
     Get mood entries for a specific date (YYYY-MM-DD format)
     """
     try:
-        entries = db.get_mood_entries_by_date(user_id, date)
+        entries = await adb.get_mood_entries_by_date(user_id, date)
         return {"user_id": user_id, "date": date, "entries": entries}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -239,7 +359,7 @@ async def get_mood_dates(user_id: str, days: int = 60):
     Get list of dates that have mood entries (for calendar highlighting)
     """
     try:
-        dates = db.get_mood_entries_dates(user_id, days=days)
+        dates = await adb.get_mood_entries_dates(user_id, days=days)
         return {"user_id": user_id, "dates": dates}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -251,7 +371,7 @@ async def get_insights(user_id: str):
     Get mood insights and patterns
     """
     try:
-        insights = mood.get_mood_insights(user_id)
+        insights = await adb.run_read(mood.get_mood_insights, user_id)
         return insights
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -261,7 +381,7 @@ async def get_insights(user_id: str):
 async def get_active_mood(user_id: str, limit: int = 20):
     """Return recent mood timeline and an active mood bar summary"""
     try:
-        entries = db.get_mood_entries(user_id, limit=limit)
+        entries = await adb.get_mood_entries(user_id, limit=limit)
 
         if not entries:
             return {
@@ -292,17 +412,24 @@ async def get_active_mood(user_id: str, limit: int = 20):
 
 
 @app.get("/api/mood/transitions/{user_id}")
-async def get_mood_transitions(user_id: str, limit: int = 50):
+async def get_mood_transitions(
+    user_id: str, limit: int = Query(50, ge=1, le=200), before_id: Optional[int] = None
+):
     """
-    Get mood transitions during conversations
+    Get mood transitions during conversations, newest first
+
+    Pass next_before_id from a response as before_id for older transitions.
     """
     try:
-        transitions = db.get_mood_transitions(user_id, limit=limit)
+        transitions = await adb.get_mood_transitions(
+            user_id, limit=limit, before_id=before_id
+        )
 
         return {
             "user_id": user_id,
             "transitions": transitions,
             "total": len(transitions),
+            "next_before_id": transitions[-1]["id"] if len(transitions) == limit else None,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -314,7 +441,7 @@ async def get_session_mood(user_id: str, minutes: int = 60):
     Get current session mood summary (last N minutes)
     """
     try:
-        summary = db.get_session_mood_summary(user_id, minutes=minutes)
+        summary = await adb.get_session_mood_summary(user_id, minutes=minutes)
 
         return summary
     except Exception as e:
@@ -326,27 +453,39 @@ async def get_current_mood_bar(user_id: str):
     """
     Get data for active mood bar visualization
     Returns: current mood, intensity, recent transitions
+
+    Served from the in-memory live state (mood_live), which is loaded from
+    the database on a user's first read and then kept current as
+    transitions are logged.
     """
     try:
-        # Get session summary (last hour)
-        summary = db.get_session_mood_summary(user_id, minutes=60)
-
-        # Get last 10 transitions for visualization
-        recent_transitions = db.get_mood_transitions(user_id, limit=10)
-
-        return {
-            "user_id": user_id,
-            "current_mood": summary.get("current_mood"),
-            "current_intensity": summary.get("current_intensity"),
-            "average_intensity": summary.get("average_intensity"),
-            "mood_distribution": summary.get("mood_distribution", {}),
-            "recent_transitions": recent_transitions[::-1],  # Chronological order
-            "session_transitions_count": summary.get("total_transitions", 0),
-        }
+        return await mood_live.get_mood_bar(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/mood/stream/{user_id}")
+async def stream_mood_updates(user_id: str):
+    """
+    Server-Sent Events equivalent of /ws/mood/{user_id}: a mood_bar event,
+    then mood_transition / mood_entry / reset events as they happen
+    """
+
+    async def event_stream():
+        try:
+            async for event in mood_events.stream(user_id):
+                yield sse_event(event["type"], event)
+        except Exception as e:
+            print(f"❌ Mood stream error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class SpotifyRequest(BaseModel):
     user_id: str
     mode: Optional[str] = "auto"
@@ -357,28 +496,18 @@ class SpotifyRequest(BaseModel):
 async def spotify_recommend(req: SpotifyRequest):
     """Recommend songs via Spotify based on current mood or search query"""
     try:
-        user_data = db.load_user_data(req.user_id)
-
         if req.mode == "search" and req.query:
             tracks = await sp.search_tracks(req.query)
             return {"tracks": tracks}
 
         # Get most recent mood
-        transitions = db.get_mood_transitions(req.user_id, limit=1)
+        transitions = await adb.get_mood_transitions(req.user_id, limit=1)
         mood_val = transitions[0]["mood"] if transitions else None
 
         if not mood_val:
-            entries = db.get_mood_entries(req.user_id, limit=20)
+            entries = await adb.get_mood_entries(req.user_id, limit=1)
             mood_val = entries[0].get("mood") if entries else None
 
-        if not mood_val:
-            insights = mood.get_mood_insights(req.user_id)
-            mood_val = (
-                insights.get("most_common_mood", {}).get("mood")
-                if isinstance(insights, dict)
-                else None
-            )
-
         if not mood_val:
             mood_val = "calm"
 
@@ -399,7 +528,8 @@ async def get_wellness_recommendations(request: WellnessRequest):
     Get personalized wellness recommendations
     """
     try:
-        user_data = db.load_user_data(request.user_id)
+        # Unknown users get default recommendations without being created
+        user_data = await adb.get_user_snapshot(request.user_id) or db.get_default_user_data()
         recommendations = well.get_recommendations(
             user_data=user_data, category=request.category
         )
@@ -487,7 +617,7 @@ async def create_calendar_event(request: CalendarEventRequest):
         event_id = str(uuid.uuid4())
         
         # Save to database
-        db.save_calendar_event(
+        await adb.save_calendar_event(
             user_id=request.user_id,
             event_id=event_id,
             google_event_id=google_event_id,
@@ -513,17 +643,34 @@ async def create_calendar_event(request: CalendarEventRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/calendar/events/{user_id}")
-async def get_calendar_events(user_id: str, days_ahead: int = 30):
+async def get_calendar_events(
+    user_id: str, days_ahead: int = 30, limit: int = Query(50, ge=1, le=200), after: Optional[str] = None
+):
     """
-    Get calendar events for a user
+    Get upcoming calendar events for a user, soonest first
+
+    Pass next_after from a response as after for the following page.
     """
     try:
-        events = db.get_calendar_events(user_id, days_ahead=days_ahead)
+        cursor = None
+        if after:
+            start_ts, sep, event_id = after.partition("|")
+            if not sep or not start_ts.lstrip("-").isdigit():
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            cursor = (int(start_ts), event_id)
+
+        events = await adb.get_calendar_events(
+            user_id, limit=limit, days_ahead=days_ahead, after=cursor
+        )
+        last = events[-1] if len(events) == limit else None
         return {
             "user_id": user_id,
             "events": events,
-            "count": len(events)
+            "count": len(events),
+            "next_after": f"{last['start_ts']}|{last['id']}" if last else None,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -534,7 +681,7 @@ async def delete_calendar_event(user_id: str, event_id: str):
     """
     try:
         # Get event to find Google event ID
-        events = db.get_calendar_events(user_id, limit=1000)
+        events = await adb.get_calendar_events(user_id, limit=1000)
         event = next((e for e in events if e["id"] == event_id), None)
         
         if event and event.get("google_event_id"):
@@ -544,7 +691,7 @@ async def delete_calendar_event(user_id: str, event_id: str):
             pass
         
         # Delete from database
-        success = db.delete_calendar_event(user_id, event_id)
+        success = await adb.delete_calendar_event(user_id, event_id)
         
         return {
             "success": success,
@@ -564,7 +711,7 @@ async def update_user_profile(request: UserProfileRequest):
     Update user profile and preferences
     """
     try:
-        user_data = db.load_user_data(request.user_id)
+        user_data = await adb.get_or_create_user(request.user_id)
 
         if request.name:
             user_data["profile"]["name"] = request.name
@@ -572,7 +719,7 @@ async def update_user_profile(request: UserProfileRequest):
         if request.preferences:
             user_data["profile"]["preferences"].update(request.preferences)
 
-        db.save_user_data(request.user_id, user_data)
+        await adb.save_user_data(request.user_id, user_data)
 
         return {"success": True, "profile": user_data["profile"]}
     except Exception as e:
@@ -585,20 +732,92 @@ async def get_user_profile(user_id: str):
     Get user profile
     """
     try:
-        user_data = db.load_user_data(user_id)
+        user_data = await adb.get_user_snapshot(user_id) or db.get_default_user_data()
+        stats = await adb.get_user_stats(user_id)
         return {
             "user_id": user_id,
             "profile": user_data.get("profile", {}),
             "stats": {
-                "total_messages": len(user_data.get("history", [])),
-                "mood_entries": len(user_data.get("mood_entries", [])),
-                "days_active": user_data.get("days_active", 0),
+                "total_messages": stats["message_count"],
+                "mood_entries": stats["mood_entry_count"],
+                "mood_transitions": stats["transition_count"],
+                "days_active": stats["active_days"],
+                "first_active": stats["first_active"],
+                "last_active": stats["last_active"],
             },
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def ndjson_lines(records, per_chunk: int = 200):
+    """Serialize records as NDJSON, a few hundred lines per chunk written"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, default=str))
+        if len(lines) >= per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@app.get("/api/user/{user_id}/export")
+async def export_user_data(user_id: str):
+    """
+    Stream all of a user's data as NDJSON (one JSON record per line)
+
+    Each record has a "type": user, chat_message, mood_entry,
+    mood_transition, daily_summary, weekly_summary, monthly_summary or
+    calendar_event.
+    """
+    if await adb.get_user(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return StreamingResponse(
+        ndjson_lines(db.iter_user_export(user_id)),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{user_id}-export.ndjson"'
+        },
+    )
+
+
+@app.post("/api/user/{user_id}/import")
+async def import_user_data(
+    user_id: str,
+    file: UploadFile = File(...),
+    fmt: Optional[str] = None,
+    default_type: Optional[str] = None,
+    enrich: bool = False,
+):
+    """
+    Bulk import mood entries, mood transitions and chat messages from an
+    NDJSON (export format) or CSV upload
+
+    Rows are inserted in IMPORT_BATCH_SIZE transactions. enrich=true queues
+    the background LLM analysis of mood entry notes, as a manual log does. fmt defaults to the file extension;
+    default_type is the record type for rows without a "type".
+    """
+    fmt = fmt or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="fmt must be ndjson or csv")
+    if default_type and default_type not in bulk_import.RECORD_TYPES:
+        raise HTTPException(status_code=400, detail=f"default_type must be one of {bulk_import.RECORD_TYPES}")
+
+    try:
+        # Its own thread rather than the single DB writer, so chat writes
+        # interleave between import batches instead of waiting for the file
+        report = await asyncio.to_thread(
+            bulk_import.import_file, file.file, fmt,
+            user_id=user_id, default_type=default_type, enrich=enrich,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"user_id": user_id, **report}
+
+
 # ══════════════════════════════════════════════════════════════
 # WEBSOCKET FOR REAL-TIME CHAT
 # ══════════════════════════════════════════════════════════════
@@ -620,40 +839,67 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
             if not message:
                 continue
 
-            user_data = db.load_user_data(user_id)
-
-            user_data["history"].append(
-                {"role": "user", "text": message, "timestamp": str(datetime.now())}
-            )
+            user_data = await adb.get_or_create_user(user_id)
+
+            await adb.append_chat_message(user_id, "user", message)
+
+            # Stream partial replies unless the client opts out with "stream": false
+            if not data.get("stream", True):
+                response_data = await chat.generate_support_response(
+                    user_data=user_data, user_message=message, user_id=user_id
+                )
+                await record_reply(user_id, user_data, response_data)
+                await websocket.send_json(
+                    {
+                        "response": response_data["response"],
+                        "mood_detected": response_data.get("mood_detected"),
+                        "mood_intensity": response_data.get("mood_intensity"),
+                        "crisis_detected": response_data.get("crisis_detected", False),
+                        "suggestions": response_data.get("suggestions"),
+                    }
+                )
+                continue
 
-            response_data = await chat.generate_support_response(
-                user_data=user_data, user_message=message, user_id=user_id
-            )
-
-            user_data["history"].append(
-                {
-                    "role": "assistant",
-                    "text": response_data["response"],
-                    "timestamp": str(datetime.now()),
-                }
-            )
-
-            db.save_user_data(user_id, user_data)
-
-            await websocket.send_json(
-                {
-                    "response": response_data["response"],
-                    "mood_detected": response_data.get("mood_detected"),
-                    "mood_intensity": response_data.get("mood_intensity"),
-                    "crisis_detected": response_data.get("crisis_detected", False),
-                    "suggestions": response_data.get("suggestions"),
-                }
-            )
+            async for frame in stream_reply(user_data, message, user_id):
+                await websocket.send_json(frame)
 
     except WebSocketDisconnect:
         print(f"🔌 WebSocket disconnected: {user_id}")
 
 
+@app.websocket("/ws/mood/{user_id}")
+async def websocket_mood(websocket: WebSocket, user_id: str):
+    """
+    Push mood updates instead of polling the mood endpoints
+    Sends the current mood bar, then each mood transition / mood entry as
+    it is logged (see mood_events.stream)
+    """
+    await websocket.accept()
+
+    async def push():
+        async for event in mood_events.stream(user_id):
+            await websocket.send_json(event)
+
+    async def wait_for_disconnect():
+        # Client messages are ignored; reading is how a disconnect is noticed
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [asyncio.create_task(push()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"❌ Mood stream error: {error}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 # ══════════════════════════════════════════════════════════════
 # HEALTH CHECK
 # ══════════════════════════════════════════════════════════════
@@ -673,6 +919,24 @@ async def health_check():
     return {"status": "healthy", "timestamp": str(datetime.now())}
 
 
+@app.get("/api/stats/mood-classifier")
+async def mood_classifier_stats():
+    """How often mood analysis was answered locally vs by the LLM"""
+    return chat.get_mood_routing_stats()
+
+
+@app.get("/api/stats/mood-cache")
+async def mood_cache_stats():
+    """Mood analysis cache hits, misses and size since startup"""
+    return mood_cache.get_stats()
+
+
+@app.get("/api/stats/mood-events")
+async def mood_events_stats():
+    """Mood push subscriptions and events published/dropped since startup"""
+    return mood_events.get_stats()
+
+
 # ══════════════════════════════════════════════════════════════
 # RUN SERVER
 # ══════════════════════════════════════════════════════════════
@@ -0,0 +1,146 @@
+"""
+Mood Analysis Cache
+LRU + TTL cache for LLM mood analyses, keyed by a hash of the normalized
+message, with an optional SQLite copy that survives restarts
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+import config
+import async_database as adb
+
+_WHITESPACE = re.compile(r"\s+")
+
+# key -> (expires_at, result); most recently used last
+_entries: "OrderedDict[str, tuple]" = OrderedDict()
+# Identical messages already being analyzed share one LLM call
+_inflight: Dict[str, asyncio.Future] = {}
+_background_tasks = set()
+
+_stats = {"hits": 0, "persistent_hits": 0, "shared": 0, "misses": 0, "evictions": 0, "skipped": 0}
+
+
+def normalize(message: str) -> str:
+    """Lowercase and collapse whitespace so trivial variants share an entry"""
+    return _WHITESPACE.sub(" ", message.strip().lower())
+
+
+def cache_key(message: str) -> Optional[str]:
+    """
+    Content hash for a message, or None if it shouldn't be cached
+
+    Long messages are practically never repeated, so only messages up to
+    MOOD_CACHE_MAX_CHARS are cached. The model name is part of the key so
+    switching models doesn't serve stale analyses.
+    """
+    text = normalize(message)
+    if not text or len(text) > config.MOOD_CACHE_MAX_CHARS:
+        return None
+    model = config.OPENAI_MODEL
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, result: Dict, expires_at: float):
+    _entries[key] = (expires_at, result)
+    _entries.move_to_end(key)
+    max_entries = config.MOOD_CACHE_MAX_ENTRIES
+    while len(_entries) > max_entries:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def _persist_later(key: str, result: Dict, expires_at: float):
+    task = asyncio.create_task(adb.save_cached_mood_analysis(key, result, expires_at))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _lookup(key: str) -> Optional[Dict]:
+    now = time.time()
+    entry = _entries.get(key)
+    if entry:
+        expires_at, result = entry
+        if expires_at > now:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return result
+        del _entries[key]
+
+    if config.MOOD_CACHE_PERSIST:
+        try:
+            row = await adb.get_cached_mood_analysis(key, now)
+        except Exception as e:
+            print(f"⚠️ Mood cache read failed: {e}")
+            row = None
+        if row:
+            result, expires_at = row
+            _remember(key, result, expires_at)
+            _stats["persistent_hits"] += 1
+            return result
+
+    return None
+
+
+async def get_or_compute(
+    message: str, compute: Callable[[str], Awaitable[Optional[Dict]]]
+) -> Optional[Dict]:
+    """
+    Return the cached analysis for message, or compute and cache it
+
+    Only non-None results are cached. Callers get their own copy, so
+    mutating a result never changes the cached entry.
+    """
+    key = cache_key(message)
+    if key is None:
+        _stats["skipped"] += 1
+        return await compute(message)
+
+    result = await _lookup(key)
+    if result is not None:
+        return dict(result)
+
+    if key in _inflight:
+        _stats["shared"] += 1
+        result = await asyncio.shield(_inflight[key])
+        return dict(result) if result is not None else None
+
+    _stats["misses"] += 1
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    result = None
+    try:
+        result = await compute(message)
+    finally:
+        # Waiters see None if this call failed or was cancelled
+        del _inflight[key]
+        future.set_result(result)
+
+    if result is not None:
+        expires_at = time.time() + config.MOOD_CACHE_TTL_SECONDS
+        _remember(key, result, expires_at)
+        if config.MOOD_CACHE_PERSIST:
+            _persist_later(key, result, expires_at)
+        return dict(result)
+    return None
+
+
+def get_stats() -> Dict:
+    """Hit/miss counters since startup plus current size"""
+    hits = _stats["hits"] + _stats["persistent_hits"] + _stats["shared"]
+    lookups = hits + _stats["misses"]
+    return {
+        **_stats,
+        "entries": len(_entries),
+        "max_entries": config.MOOD_CACHE_MAX_ENTRIES,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+    }
+
+
+def clear():
+    """Drop every in-memory entry (the persistent table is left alone)"""
+    _entries.clear()
@@ -0,0 +1,279 @@
+"""
+Local Mood Classifier
+Hashed n-gram softmax model trained offline from mood_transitions, used as a
+fast path before the LLM mood analysis
+
+Train:
+    python mood_classifier.py train [--db mental_health.db] [--out models/mood_classifier.npz]
+"""
+
+import argparse
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: without NumPy every message goes to the LLM
+    np = None
+
+import config
+
+# Notes on transitions labelled by this model start with this, so training skips them
+LOCAL_NOTES_PREFIX = "[local]"
+
+DEFAULT_FEATURES = 2 ** 16
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+# ══════════════════════════════════════════════════════════════
+# FEATURES
+# ══════════════════════════════════════════════════════════════
+
+
+def _ngrams(text: str) -> List[str]:
+    """Word unigrams + bigrams and character trigrams (for typos like 'goway')"""
+    words = _TOKEN.findall(text.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return grams
+
+
+def featurize(text: str, dim: int) -> Tuple["np.ndarray", float]:
+    """
+    Hash a message into sparse feature indices
+
+    crc32 rather than hash() so indices are stable across processes. Repeated
+    indices are kept (summing them is the count), which skips a sort/unique
+    on the hot path.
+
+    Returns:
+        (indices, scale) - every gram's feature index and the 1/sqrt(n)
+        weight each one carries
+    """
+    grams = _ngrams(text)
+    if not grams:
+        return np.zeros(0, dtype=np.int64), 0.0
+    hashed = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.int64) % dim
+    return hashed, 1.0 / np.sqrt(len(grams))
+
+
+# ══════════════════════════════════════════════════════════════
+# MODEL
+# ══════════════════════════════════════════════════════════════
+
+
+class MoodClassifier:
+    """Softmax regression over hashed n-grams, plus a linear intensity head"""
+
+    def __init__(self, labels: Sequence[str], weights, bias, intensity_weights, intensity_bias):
+        self.labels = list(labels)
+        self.weights = weights  # (dim, n_labels)
+        self.bias = bias  # (n_labels,)
+        self.intensity_weights = intensity_weights  # (dim,)
+        self.intensity_bias = float(intensity_bias)
+        self.dim = weights.shape[0]
+
+    @classmethod
+    def load(cls, path: str) -> "MoodClassifier":
+        data = np.load(path, allow_pickle=False)
+        return cls(
+            [str(label) for label in data["labels"]],
+            data["weights"],
+            data["bias"],
+            data["intensity_weights"],
+            data["intensity_bias"],
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+            intensity_weights=self.intensity_weights,
+            intensity_bias=np.float32(self.intensity_bias),
+        )
+
+    def predict(self, message: str) -> Optional[Dict]:
+        """
+        Classify one message
+
+        Returns:
+            Dict shaped like the LLM mood analysis (mood, intensity,
+            confidence, notes), or None if the message has no features
+        """
+        idx, scale = featurize(message, self.dim)
+        if idx.size == 0:
+            return None
+
+        logits = self.weights.take(idx, axis=0).sum(axis=0) * scale + self.bias
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        intensity = self.intensity_weights.take(idx).sum() * scale + self.intensity_bias
+
+        return {
+            "mood": self.labels[best],
+            "intensity": min(10, max(1, round(float(intensity)))),
+            "confidence": round(float(probs[best]), 3),
+            "notes": f"{LOCAL_NOTES_PREFIX} p={probs[best]:.2f}",
+        }
+
+
+_classifier: Optional[MoodClassifier] = None
+_load_attempted = False
+
+
+def get_classifier() -> Optional[MoodClassifier]:
+    """Load the trained model once; None if NumPy or the model file is missing"""
+    global _classifier, _load_attempted
+    if _load_attempted:
+        return _classifier
+    _load_attempted = True
+
+    path = config.MOOD_CLASSIFIER_PATH
+    if np is None:
+        print("⚠️ NumPy not installed - local mood classifier disabled")
+    elif not os.path.exists(path):
+        print(f"⚠️ No mood classifier at {path} - run: python mood_classifier.py train")
+    else:
+        try:
+            _classifier = MoodClassifier.load(path)
+            print(f"🧠 Mood classifier loaded ({len(_classifier.labels)} moods)")
+        except Exception as e:
+            print(f"⚠️ Failed to load mood classifier: {e}")
+    return _classifier
+
+
+# ══════════════════════════════════════════════════════════════
+# TRAINING
+# ══════════════════════════════════════════════════════════════
+
+
+def train(
+    rows: Sequence[Tuple[str, str, int]],
+    dim: int = DEFAULT_FEATURES,
+    epochs: int = 300,
+    learning_rate: float = 1.0,
+    l2: float = 1e-4,
+) -> MoodClassifier:
+    """
+    Fit the model with full-batch gradient descent
+
+    Args:
+        rows: (message, mood, intensity) training examples
+    """
+    feats = [(featurize(msg, dim), mood, intensity) for msg, mood, intensity in rows]
+    feats = [f for f in feats if f[0][0].size]
+    if not feats:
+        raise ValueError("no training rows with usable text")
+
+    labels = sorted({mood for _, mood, _ in feats})
+    label_index = {label: i for i, label in enumerate(labels)}
+    n, k = len(feats), len(labels)
+
+    # Flattened sparse design matrix: row r owns entries starts[r]:starts[r + 1]
+    lengths = np.array([f[0][0].size for f in feats])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    row_of = np.repeat(np.arange(n), lengths)
+    cols = np.concatenate([f[0][0] for f in feats])
+    vals = np.repeat([f[0][1] for f in feats], lengths).astype(np.float32)
+
+    targets = np.zeros((n, k), dtype=np.float32)
+    targets[np.arange(n), [label_index[f[1]] for f in feats]] = 1.0
+    intensities = np.array([float(f[2] or 5) for f in feats], dtype=np.float32)
+
+    weights = np.zeros((dim, k), dtype=np.float32)
+    bias = np.zeros(k, dtype=np.float32)
+    iw = np.zeros(dim, dtype=np.float32)
+    ib = np.float32(intensities.mean())
+
+    for _ in range(epochs):
+        logits = np.add.reduceat(weights[cols] * vals[:, None], starts) + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        grad = (probs - targets) / n
+        grad_w = np.zeros_like(weights)
+        np.add.at(grad_w, cols, vals[:, None] * grad[row_of])
+        weights -= learning_rate * (grad_w + l2 * weights)
+        bias -= learning_rate * grad.sum(axis=0)
+
+        residual = (np.add.reduceat(iw[cols] * vals, starts) + ib - intensities) / n
+        grad_iw = np.zeros_like(iw)
+        np.add.at(grad_iw, cols, vals * residual[row_of])
+        iw -= learning_rate * (grad_iw + l2 * iw)
+        ib -= learning_rate * residual.sum()
+
+    return MoodClassifier(labels, weights, bias, iw, ib)
+
+
+def evaluate(model: MoodClassifier, rows: Sequence[Tuple[str, str, int]], threshold: float) -> Dict:
+    """Accuracy overall and on the messages that would skip the LLM at threshold"""
+    total = correct = confident = confident_correct = 0
+    for msg, mood, _ in rows:
+        pred = model.predict(msg)
+        if pred is None:
+            continue
+        total += 1
+        hit = pred["mood"] == mood
+        correct += hit
+        if pred["confidence"] >= threshold:
+            confident += 1
+            confident_correct += hit
+    return {
+        "examples": total,
+        "accuracy": correct / total if total else 0.0,
+        "local_rate": confident / total if total else 0.0,
+        "local_accuracy": confident_correct / confident if confident else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local mood classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="fit on mood_transitions and save the model")
+    train_cmd.add_argument("--db", default=config.DATABASE_PATH)
+    train_cmd.add_argument("--out", default=config.MOOD_CLASSIFIER_PATH)
+    train_cmd.add_argument("--dim", type=int, default=DEFAULT_FEATURES)
+    train_cmd.add_argument("--epochs", type=int, default=300)
+    train_cmd.add_argument("--holdout", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("NumPy is required to train: pip install numpy")
+
+    import database as db
+
+    db.DB_PATH = args.db
+    rows = db.get_labelled_transitions(exclude_context_prefix=LOCAL_NOTES_PREFIX)
+    print(f"📚 {len(rows)} labelled transitions")
+
+    order = np.random.default_rng(0).permutation(len(rows))
+    n_test = int(len(rows) * args.holdout)
+    test = [rows[i] for i in order[:n_test]]
+    train_rows = [rows[i] for i in order[n_test:]]
+
+    model = train(train_rows, dim=args.dim, epochs=args.epochs)
+    threshold = config.MOOD_CLASSIFIER_THRESHOLD
+    if test:
+        report = evaluate(model, test, threshold)
+        print(
+            f"📊 holdout n={report['examples']} accuracy={report['accuracy']:.2%} | "
+            f"confidence>={threshold}: local={report['local_rate']:.2%} "
+            f"accuracy={report['local_accuracy']:.2%}"
+        )
+
+    model.save(args.out)
+    print(f"✅ Saved {len(model.labels)}-mood classifier to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Mood Events
+In-process pub/sub for mood updates: committed mood transitions and mood
+entries are pushed to each user's WebSocket/SSE subscribers, so dashboards
+don't have to poll the mood endpoints
+"""
+
+import asyncio
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Set
+
+import config
+import database as db
+import mood_live
+
+# user_id -> open subscriptions; only touched on the event loop
+_subscribers: Dict[str, Set["Subscription"]] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+_stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+
+class Subscription:
+    """One subscriber's bounded queue; when it is full the oldest event is dropped"""
+
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def push(self, event: Dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            _stats["dropped"] += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict:
+        """
+        Next event; after drops it carries "dropped" (events missed since
+        the last one delivered) so the client knows to resync
+        """
+        event = await self.queue.get()
+        if self.dropped:
+            event = {**event, "dropped": self.dropped}
+            self.dropped = 0
+        return event
+
+
+def bind_loop(loop: Optional[asyncio.AbstractEventLoop]):
+    """Deliver events on this loop (the server's); None stops publishing"""
+    global _loop
+    _loop = loop
+
+
+@contextmanager
+def subscribe(user_id: str) -> Iterator[Subscription]:
+    """Receive a user's events for the duration of the block"""
+    subscription = Subscription(user_id, config.MOOD_EVENTS_QUEUE_SIZE)
+    _subscribers.setdefault(user_id, set()).add(subscription)
+    try:
+        yield subscription
+    finally:
+        subscriptions = _subscribers.get(user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del _subscribers[user_id]
+
+
+def publish(user_id: str, event: Dict):
+    """Fan an event out to a user's subscribers (event loop only)"""
+    _stats["published"] += 1
+    for subscription in _subscribers.get(user_id, ()):
+        subscription.push(event)
+        _stats["delivered"] += 1
+
+
+def _forward(event_type: str):
+    """Commit listener that hands the event to the loop (commits run on the writer thread)"""
+
+    def listener(user_id: str, record: Optional[Dict]):
+        loop = _loop
+        if loop is None or loop.is_closed() or user_id not in _subscribers:
+            return
+        data = None
+        if record is not None:
+            data = {k: v for k, v in record.items() if k != "ts"}
+        loop.call_soon_threadsafe(publish, user_id, {"type": event_type, "data": data})
+
+    return listener
+
+
+async def stream(user_id: str) -> AsyncIterator[Dict]:
+    """
+    Events for one connection: the current mood bar first, then deltas as
+    they commit ("mood_transition", "mood_entry", and "reset" when the
+    user's transitions were deleted or imported and the client should
+    refetch), with a "heartbeat" after MOOD_EVENTS_HEARTBEAT_SECONDS idle
+    """
+    heartbeat = config.MOOD_EVENTS_HEARTBEAT_SECONDS
+    with subscribe(user_id) as subscription:
+        # Subscribed first so nothing committed while loading is missed;
+        # a transition can show up in both, and ids tell them apart
+        yield {"type": "mood_bar", "data": await mood_live.get_mood_bar(user_id)}
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield {"type": "heartbeat"}
+
+
+def get_stats() -> Dict:
+    """Events published, delivered and dropped since startup plus open subscriptions"""
+    return {
+        **_stats,
+        "users": len(_subscribers),
+        "subscriptions": sum(len(s) for s in _subscribers.values()),
+    }
+
+
+db.add_commit_listener("mood_transition", _forward("mood_transition"))
+db.add_commit_listener("mood_entry", _forward("mood_entry"))
+db.add_commit_listener("mood_transitions_invalidated", _forward("reset"))
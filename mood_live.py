@@ -0,0 +1,237 @@
+"""
+Live Mood Bar
+Per-user mood bar state kept in process - the last few transitions plus mood
+counts and an intensity sum over a sliding window - updated as transitions
+commit, so GET /api/mood/current is served without touching the database.
+Transitions written by other processes don't reach the commit listeners:
+the bulk import CLI touches a marker file next to the database that drops
+every state, and with several server workers MOOD_BAR_REVALIDATE_SECONDS
+has each state checked against SQLite that often.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+import config
+import database as db
+import async_database as adb
+
+
+class LiveMoodState:
+    """One user's mood bar; every method is O(1) amortized"""
+
+    def __init__(self, window_seconds: int, recent_size: int):
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        # Display dicts of the last few transitions, oldest first
+        self.recent = deque(maxlen=recent_size)
+        # (ts, mood, intensity) of every transition inside the window, oldest first
+        self.window = deque()
+        self.mood_counts: Dict[str, int] = {}
+        self.intensity_sum = 0
+        self.last_id = 0
+        # time.monotonic() of the last load or check against SQLite
+        self.checked_at = 0.0
+        # Transitions committed while the cold-start load is running
+        self.pending: Optional[List[Dict]] = []
+        self.ready: Optional[asyncio.Future] = None
+
+    def _add_recent(self, transition: Dict):
+        display = dict(transition)
+        display.pop("ts", None)
+        self.recent.append(display)
+
+    def _add_to_window(self, transition: Dict):
+        self.window.append((transition["ts"], transition["mood"], transition["intensity"]))
+        self.mood_counts[transition["mood"]] = self.mood_counts.get(transition["mood"], 0) + 1
+        self.intensity_sum += transition["intensity"]
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self.window and self.window[0][0] < cutoff:
+            _, mood, intensity = self.window.popleft()
+            self.intensity_sum -= intensity
+            self.mood_counts[mood] -= 1
+            if not self.mood_counts[mood]:
+                del self.mood_counts[mood]
+
+    def add(self, transition: Dict):
+        """Apply a committed transition (ignored if already seen)"""
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(transition)
+            elif transition["id"] > self.last_id:
+                self.last_id = transition["id"]
+                self._add_recent(transition)
+                self._add_to_window(transition)
+
+    def load(self, recent: List[Dict], window: List[Dict]):
+        """
+        Fill a cold state from SQL, then apply what committed meanwhile
+
+        recent are the last few transitions and window every transition
+        inside the window (with ts), both oldest first. Ids only grow, so a
+        transition that committed after either query has a larger id than
+        every row that query returned.
+        """
+        with self.lock:
+            recent_id = max((t["id"] for t in recent), default=0)
+            window_id = max((t["id"] for t in window), default=0)
+            for transition in recent:
+                self._add_recent(transition)
+            for transition in window:
+                self._add_to_window(transition)
+            self.last_id = max(recent_id, window_id)
+            self.checked_at = time.monotonic()
+            pending, self.pending = self.pending, None
+            for transition in pending:
+                if transition["id"] > recent_id:
+                    self._add_recent(transition)
+                if transition["id"] > window_id:
+                    self._add_to_window(transition)
+                self.last_id = max(self.last_id, transition["id"])
+
+    def snapshot(self) -> Dict:
+        """Mood bar fields, shaped like the session summary + recent transitions"""
+        with self.lock:
+            self._expire(time.time())
+            count = len(self.window)
+            latest = self.window[-1] if count else None
+            return {
+                "current_mood": latest[1] if latest else None,
+                "current_intensity": latest[2] if latest else None,
+                "average_intensity": round(self.intensity_sum / count, 1) if count else None,
+                "mood_distribution": dict(self.mood_counts),
+                "recent_transitions": list(self.recent),
+                "session_transitions_count": count,
+            }
+
+
+# user_id -> state; most recently read last
+_states: "OrderedDict[str, LiveMoodState]" = OrderedDict()
+_states_lock = threading.Lock()
+_load_tasks = set()
+# mtime of the stale marker when last checked (None before the first read)
+_marker_mtime: Optional[int] = None
+
+
+def _marker_path() -> str:
+    return f"{db.DB_PATH}.mood-bar-stale"
+
+
+def mark_stale():
+    """Have every server process drop its live states (after writing transitions from outside it)"""
+    with open(_marker_path(), "a"):
+        pass
+    os.utime(_marker_path())
+
+
+def _check_marker():
+    global _marker_mtime
+    try:
+        mtime = os.stat(_marker_path()).st_mtime_ns
+    except OSError:
+        mtime = 0
+    if _marker_mtime is not None and mtime != _marker_mtime:
+        clear()
+    _marker_mtime = mtime
+
+
+def _load_rows(user_id: str, window_seconds: int, recent_size: int):
+    recent = db.get_mood_transitions(user_id, limit=recent_size)[::-1]
+    window = db.get_mood_transitions_since(user_id, int(time.time()) - window_seconds)
+    return recent, window
+
+
+async def _load(user_id: str, state: LiveMoodState):
+    try:
+        recent, window = await adb.run_read(
+            _load_rows, user_id, state.window_seconds, state.recent.maxlen
+        )
+        state.load(recent, window)
+    except Exception as e:
+        # Forget the state so the next read retries the load
+        with _states_lock:
+            if _states.get(user_id) is state:
+                del _states[user_id]
+        state.ready.set_exception(e)
+        return
+    state.ready.set_result(None)
+
+
+def _get_or_load(user_id: str) -> LiveMoodState:
+    with _states_lock:
+        state = _states.get(user_id)
+        if state is not None:
+            _states.move_to_end(user_id)
+        else:
+            state = _states[user_id] = LiveMoodState(
+                config.MOOD_BAR_WINDOW_MINUTES * 60,
+                config.MOOD_BAR_RECENT_TRANSITIONS,
+            )
+            while len(_states) > config.MOOD_BAR_MAX_USERS:
+                _states.popitem(last=False)
+            state.ready = asyncio.get_running_loop().create_future()
+            # The load outlives a cancelled request so other readers still get it
+            task = asyncio.ensure_future(_load(user_id, state))
+            _load_tasks.add(task)
+            task.add_done_callback(_load_tasks.discard)
+    return state
+
+
+async def get_state(user_id: str) -> LiveMoodState:
+    """
+    A user's live state, loading it from SQLite on the first read and
+    reloading it when a check finds transitions it hasn't seen
+    """
+    _check_marker()
+    state = _get_or_load(user_id)
+    await asyncio.shield(state.ready)
+    interval = config.MOOD_BAR_REVALIDATE_SECONDS
+    now = time.monotonic()
+    if interval is None or now - state.checked_at < interval:
+        return state
+    # Claimed before awaiting so concurrent reads don't all check
+    state.checked_at = now
+    if await adb.get_last_transition_id(user_id) == state.last_id:
+        return state
+    # Another process logged or imported transitions, or deleted the user's
+    # (one committed here since the query only costs a spare reload)
+    with _states_lock:
+        if _states.get(user_id) is state:
+            del _states[user_id]
+    state = _get_or_load(user_id)
+    await asyncio.shield(state.ready)
+    return state
+
+
+async def get_mood_bar(user_id: str) -> Dict:
+    """Current mood bar for a user (see LiveMoodState.snapshot)"""
+    state = await get_state(user_id)
+    return {"user_id": user_id, **state.snapshot()}
+
+
+def _on_transition(user_id: str, transition: Dict):
+    with _states_lock:
+        state = _states.get(user_id)
+    if state is not None:
+        state.add(transition)
+
+
+def _on_invalidated(user_id: str, _record):
+    with _states_lock:
+        _states.pop(user_id, None)
+
+
+def clear():
+    """Drop every user's state (each is reloaded on its next read)"""
+    with _states_lock:
+        _states.clear()
+
+
+db.add_commit_listener("mood_transition", _on_transition)
+db.add_commit_listener("mood_transitions_invalidated", _on_invalidated)
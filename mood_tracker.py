@@ -4,14 +4,20 @@ Handles mood logging, analysis, and insights
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import uuid
 from collections import Counter
+import config
 import database as db
+import async_database as adb
+import background_jobs as jobs
 from chatbot_engine import analyze_mood_with_llm
 
+# Days of mood data behind get_mood_insights
+INSIGHTS_WINDOW_DAYS = 30
 
-def log_mood_entry(
+
+async def log_mood_entry(
     user_id: str,
     mood: str,
     intensity: int,
@@ -22,6 +28,10 @@ def log_mood_entry(
     """
     Log a mood entry for a user
 
+    The entry is saved with the user's own mood and intensity. If there are
+    notes, an LLM reading of them is queued as a background job and stored
+    on the entry as "analysis" later, so logging never waits on the LLM.
+
     Args:
         user_id: User identifier
         mood: Mood type (happy, sad, anxious, stressed, angry, calm, etc.)
@@ -49,30 +59,23 @@ def log_mood_entry(
     else:
         entry_timestamp = datetime.now()
 
-    mod = analyze_mood_with_llm(notes)
-    # Save to database
-    db.save_mood_entry(
+    # Save to database, queueing the enrichment with it
+    await adb.save_mood_entry(
         user_id=user_id,
         entry_id=entry_id,
-        mood=mod["mood"],
-        intensity=mod["intensity"],
-        notes=mod.get("notes", notes),
+        mood=mood,
+        intensity=intensity,
+        notes=notes,
         triggers=triggers,
         timestamp=entry_timestamp,
+        enrichment_job=ENRICHMENT_JOB,
     )
+    if notes:
+        jobs.wake(ENRICHMENT_JOB)
 
-    # Update user data
-    user_data = db.load_user_data(user_id)
-    user_data["mood_entries"].append(
-        {
-            "id": entry_id,
-            "mood": mood,
-            "intensity": intensity,
-            "timestamp": str(entry_timestamp),
-        }
-    )
-    user_data["stats"]["total_mood_logs"] = len(user_data["mood_entries"])
-    db.save_user_data(user_id, user_data)
+    # First log from a new user - create their record
+    if await adb.get_user_snapshot(user_id) is None:
+        await adb.get_or_create_user(user_id)
 
     print(
         f"📊 Mood logged: {mood} ({intensity}/10) for user {user_id} on {entry_timestamp.strftime('%Y-%m-%d')}"
@@ -80,6 +83,42 @@ def log_mood_entry(
     return entry_id
 
 
+def iter_mood_window(user_id: str, days: int) -> Iterator[Dict]:
+    """
+    Stream a user's mood entries from the last `days` days, newest first
+
+    The window is applied in SQL, so only those rows are read (no cap on
+    how many). Entries dated later today are included.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    return db.get_mood_entries_between(user_id, start=cutoff)
+
+
+ENRICHMENT_JOB = "mood_enrichment"
+
+
+async def _run_enrichment_job(entry_id: str, payload: Optional[Dict]):
+    """Analyze a logged entry's notes and attach the result to the entry"""
+    entry = await adb.get_mood_entry(entry_id)
+    if not entry or not entry["notes"] or entry["analysis"]:
+        return
+
+    # Off the request path, so always the LLM: the local classifier is
+    # trained on chat messages, not mood-log notes
+    analysis = await analyze_mood_with_llm(entry["notes"])
+    if analysis is None:
+        # Raise so the job is retried up to JOB_MAX_ATTEMPTS
+        raise RuntimeError("mood analysis unavailable")
+    await adb.save_mood_analysis(entry_id, analysis)
+
+
+jobs.register_handler(
+    ENRICHMENT_JOB,
+    _run_enrichment_job,
+    concurrency=config.MOOD_ENRICHMENT_CONCURRENCY,
+)
+
+
 def get_mood_history(user_id: str, days: int = 30) -> List[Dict]:
     """
     Get mood history for a user
@@ -91,59 +130,57 @@ def get_mood_history(user_id: str, days: int = 30) -> List[Dict]:
     Returns:
         List of mood entries
     """
-    entries = db.get_mood_entries(user_id, limit=1000)
-
-    # Filter by date
-    cutoff_date = datetime.now() - timedelta(days=days)
-    filtered_entries = []
-
-    for entry in entries:
-        ts = entry.get("timestamp")
-        if not ts:
-            continue
-        try:
-            entry_date = datetime.fromisoformat(ts)
-        except Exception:
-            # Skip entries with invalid timestamp formats
-            continue
-        if entry_date >= cutoff_date:
-            filtered_entries.append(entry)
-
-    return filtered_entries
+    return list(iter_mood_window(user_id, days))
 
 
 def get_mood_insights(user_id: str) -> Dict:
     """
     Generate insights from mood data
 
+    Built from the per-day rollups in mood_daily_rollups, so the cost
+    depends on the number of days in the window, not the number of entries.
+
     Returns:
         Dictionary with mood insights and patterns
     """
-    entries = get_mood_history(user_id, days=30)
+    today = datetime.now().date()
+    rollups = db.get_mood_rollups(
+        user_id, (today - timedelta(days=INSIGHTS_WINDOW_DAYS)).isoformat()
+    )
+    entries_count = sum(r["count"] for r in rollups)
 
-    if not entries:
+    if not entries_count:
         return {
             "message": "Not enough data yet. Log a few moods to see insights!",
             "entries_count": 0,
         }
 
     # Calculate statistics
-    moods = [e["mood"] for e in entries]
-    intensities = [e["intensity"] for e in entries]
+    mood_counts = Counter()
+    trigger_counts = Counter()
+    hour_counts = [0] * 24
+    hour_sums = [0] * 24
+    for r in rollups:
+        mood_counts.update(r["mood_counts"])
+        trigger_counts.update(r["trigger_counts"])
+        for hour in range(24):
+            hour_counts[hour] += r["hour_counts"][hour]
+            hour_sums[hour] += r["hour_sums"][hour]
 
-    mood_counts = Counter(moods)
     most_common_mood = mood_counts.most_common(1)[0] if mood_counts else ("", 0)
 
-    avg_intensity = sum(intensities) / len(intensities) if intensities else 0
+    avg_intensity = sum(r["intensity_sum"] for r in rollups) / entries_count
 
     # Detect trends (last 7 days vs previous 7 days)
-    last_7_days = entries[:7] if len(entries) >= 7 else entries
-    prev_7_days = entries[7:14] if len(entries) >= 14 else []
+    recent_start = (today - timedelta(days=6)).isoformat()
+    previous_start = (today - timedelta(days=13)).isoformat()
+    last_7_days = [r for r in rollups if r["day"] >= recent_start]
+    prev_7_days = [r for r in rollups if previous_start <= r["day"] < recent_start]
 
     trend = None
     if last_7_days and prev_7_days:
-        last_7_avg = sum(e["intensity"] for e in last_7_days) / len(last_7_days)
-        prev_7_avg = sum(e["intensity"] for e in prev_7_days) / len(prev_7_days)
+        last_7_avg = _average_intensity(last_7_days)
+        prev_7_avg = _average_intensity(prev_7_days)
 
         if last_7_avg > prev_7_avg + 1:
             trend = "improving"
@@ -153,18 +190,13 @@ def get_mood_insights(user_id: str) -> Dict:
             trend = "stable"
 
     # Find common triggers
-    all_triggers = []
-    for entry in entries:
-        if entry.get("triggers"):
-            all_triggers.extend(entry["triggers"])
-
-    common_triggers = Counter(all_triggers).most_common(3) if all_triggers else []
+    common_triggers = trigger_counts.most_common(3)
 
-    # Time of day analysis (if we have timestamps)
-    time_patterns = analyze_time_patterns(entries)
+    # Time of day analysis
+    time_patterns = analyze_time_patterns(hour_counts, hour_sums)
 
     insights = {
-        "entries_count": len(entries),
+        "entries_count": entries_count,
         "most_common_mood": {"mood": most_common_mood[0], "count": most_common_mood[1]},
         "average_intensity": round(avg_intensity, 1),
         "trend": trend,
@@ -179,43 +211,30 @@ def get_mood_insights(user_id: str) -> Dict:
     return insights
 
 
-def analyze_time_patterns(entries: List[Dict]) -> Dict:
-    """Analyze when moods tend to occur"""
-    if not entries:
-        return {}
+def _average_intensity(rollups: List[Dict]) -> float:
+    return sum(r["intensity_sum"] for r in rollups) / sum(r["count"] for r in rollups)
 
-    morning = []  # 6am-12pm
-    afternoon = []  # 12pm-6pm
-    evening = []  # 6pm-12am
-    night = []  # 12am-6am
 
-    for entry in entries:
-        try:
-            timestamp = datetime.fromisoformat(entry["timestamp"])
-            hour = timestamp.hour
-            intensity = entry["intensity"]
-
-            if 6 <= hour < 12:
-                morning.append(intensity)
-            elif 12 <= hour < 18:
-                afternoon.append(intensity)
-            elif 18 <= hour < 24:
-                evening.append(intensity)
-            else:
-                night.append(intensity)
-        except:
-            continue
+def analyze_time_patterns(hour_counts: List[int], hour_sums: List[int]) -> Dict:
+    """
+    Analyze when moods tend to occur
 
-    patterns = {}
+    Args:
+        hour_counts: Entries per local hour (0-23)
+        hour_sums: Intensity totals per local hour
+    """
+    periods = {
+        "morning": range(6, 12),
+        "afternoon": range(12, 18),
+        "evening": range(18, 24),
+        "night": range(0, 6),
+    }
 
-    if morning:
-        patterns["morning"] = round(sum(morning) / len(morning), 1)
-    if afternoon:
-        patterns["afternoon"] = round(sum(afternoon) / len(afternoon), 1)
-    if evening:
-        patterns["evening"] = round(sum(evening) / len(evening), 1)
-    if night:
-        patterns["night"] = round(sum(night) / len(night), 1)
+    patterns = {}
+    for name, hours in periods.items():
+        count = sum(hour_counts[h] for h in hours)
+        if count:
+            patterns[name] = round(sum(hour_sums[h] for h in hours) / count, 1)
 
     return patterns
 
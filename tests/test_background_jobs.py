@@ -0,0 +1,54 @@
+"""Background job worker: the loop survives a failed claim"""
+
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import async_database as adb
+import background_jobs as jobs
+import config
+import database as db
+
+
+def test_worker_survives_failed_claim(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(config, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+    db.init_db()
+
+    claim_jobs = adb.claim_jobs
+    claims = []
+
+    async def flaky_claim_jobs(kind, limit):
+        claims.append(kind)
+        if len(claims) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return await claim_jobs(kind, limit)
+
+    monkeypatch.setattr(adb, "claim_jobs", flaky_claim_jobs)
+
+    done = []
+
+    async def handler(job_key, payload):
+        done.append(job_key)
+
+    monkeypatch.setattr(jobs, "_handlers", {})
+    jobs.register_handler("test", handler)
+
+    async def run():
+        await jobs.start()
+        try:
+            await jobs.enqueue("test", "job-1")
+            for _ in range(100):
+                if done:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await jobs.stop()
+
+    asyncio.run(run())
+
+    assert len(claims) > 1
+    assert done == ["job-1"]